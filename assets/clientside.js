@@ -0,0 +1,170 @@
+// Clientside callbacks, which only need what the browser already has and therefore do not need a request to the server.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    imperium: {
+        // Select the clicked country of the world map and clear the other dropdowns when one of the dropdowns
+        // changes. Dropdowns that are already empty are not updated, so they do not trigger the server callbacks.
+        select_dropdown: function(country, organisation, sub_category, click_data) {
+            const no_update = window.dash_clientside.no_update;
+            const clear = function(value) {
+                return value === null || value === undefined ? no_update : null;
+            };
+
+            if (click_data) {
+                return [click_data.points[0].hovertext, clear(organisation), clear(sub_category), null];
+            }
+
+            const triggered = window.dash_clientside.callback_context.triggered.map(function(trigger) {
+                return trigger.prop_id;
+            });
+            if (triggered.includes('countries-dropdown.value') && country) {
+                return [no_update, clear(organisation), clear(sub_category), no_update];
+            } else if (triggered.includes('organisations-dropdown.value') && organisation) {
+                return [clear(country), no_update, clear(sub_category), no_update];
+            } else if (triggered.includes('sub-categories-dropdown.value') && sub_category) {
+                return [clear(country), clear(organisation), no_update, no_update];
+            }
+            throw window.dash_clientside.PreventUpdate;
+        },
+
+        // Switch the compare tab to the type of the selected country, organisation or category.
+        select_tab: function(country, organisation, sub_category) {
+            const tabs = {
+                'countries-dropdown.value': ['tab-country', country],
+                'organisations-dropdown.value': ['tab-organisation', organisation],
+                'sub-categories-dropdown.value': ['tab-category', sub_category]
+            };
+            const triggered = window.dash_clientside.callback_context.triggered;
+            for (let i = 0; i < triggered.length; i++) {
+                const tab = tabs[triggered[i].prop_id];
+                if (tab && tab[1]) {
+                    return tab[0];
+                }
+            }
+            throw window.dash_clientside.PreventUpdate;
+        },
+
+        // Copy the options of the organisation dropdown to the compare organisations dropdown when its tab is opened
+        // for the first time, so the list of all organisations is only sent once with the page.
+        copy_organisation_options: function(tab, options, compare_options) {
+            if (tab !== 'tab-organisation' || (compare_options && compare_options.length)) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            return options;
+        },
+
+        // Update the information cards and the explore plot from the totals that were sent to the browser once, in
+        // the same way as the update_explore_selection callback on the server.
+        render_explore: function(country, organisation, sub_category, bundle) {
+            const no_update = window.dash_clientside.no_update;
+            const no_criteria = '**No criteria selected**';
+            const selection = [
+                ['countries-dropdown.value', 'country head office', country],
+                ['organisations-dropdown.value', 'organisation name', organisation],
+                ['sub-categories-dropdown.value', 'sub_cat', sub_category]
+            ];
+            const selected = selection.find(function(dropdown) {
+                return dropdown[2] !== null && dropdown[2] !== undefined;
+            });
+
+            if (!bundle) {
+                if (selected) {
+                    throw window.dash_clientside.PreventUpdate;
+                }
+                return [no_criteria, no_criteria, no_criteria, no_update];
+            }
+
+            // Information cards of the selection with the highest priority.
+            let info_card = no_criteria;
+            let info_card_2 = no_criteria;
+            let selected_country = no_criteria;
+            if (selected) {
+                const [_, column, value] = selected;
+                const totals = explore_totals(bundle, column, value);
+                const name = totals.name;
+                selected_country = name;
+                if (column === 'country head office') {
+                    info_card = '**' + name + '** has ' + totals.rows + ' organisations in our database';
+                    info_card_2 = '**' + name + '** has ' + totals.ep_passes + ' EP Passes';
+                } else if (column === 'organisation name') {
+                    info_card = '**' + name + '** has ' + totals.lobbyists + ' lobbyists';
+                    info_card_2 = '**' + name + '** has ' + totals.ep_passes + ' EP Passes';
+                } else {
+                    info_card = 'There are ' + totals.rows + ' **' + name + '** in our database';
+                    info_card_2 = '**' + name + '** has ' + totals.ep_passes + ' EP Passes';
+                }
+            }
+
+            // The explore plot follows the dropdown that was changed, or the selection with the highest priority
+            // when the totals just arrived. Dash merges the triggers that are pending at the same time, so the
+            // dropdowns that select_dropdown just cleared can be triggered as well; they are skipped, like there.
+            const triggered = window.dash_clientside.callback_context.triggered.map(function(trigger) {
+                return trigger.prop_id;
+            });
+            let plotted = selection.find(function(dropdown) {
+                return triggered.includes(dropdown[0]) && dropdown[2] !== null && dropdown[2] !== undefined;
+            });
+            if (!plotted && triggered.includes('explore-bundle.data')) {
+                plotted = selected;
+            }
+            const totals = plotted ? explore_totals(bundle, plotted[1], plotted[2]) : null;
+            return [info_card, info_card_2, selected_country, explore_plot(bundle, totals)];
+        }
+    }
+});
+
+// Index of the values of every column in the totals, so the totals of a value are found without searching.
+const explore_indices = new WeakMap();
+
+// Get the name, the totals per year and the numbers on the information cards of a country, sub category or
+// organisation (ID). The numbers are zero when the value is not in the totals, like on the server.
+function explore_totals(bundle, column, value) {
+    if (!explore_indices.has(bundle)) {
+        const indices = {};
+        Object.keys(bundle.columns).forEach(function(column) {
+            indices[column] = new Map(bundle.columns[column].values.map(function(value, position) {
+                return [value, position];
+            }));
+        });
+        explore_indices.set(bundle, indices);
+    }
+
+    const totals = bundle.columns[column];
+    const position = value === null || value === undefined ? undefined : explore_indices.get(bundle)[column].get(value);
+    if (position === undefined) {
+        return {name: value, years: [], begin_int: [], end_int: [], rows: 0, ep_passes: 0, lobbyists: '0'};
+    }
+    const begin = totals.offsets[position];
+    const end = totals.offsets[position + 1];
+    // The amount of lobbyists is a float on the server, which Python shows with at least one decimal.
+    const lobbyists = totals.lobbyists[position];
+    return {
+        name: totals.names[position],
+        years: totals.years.slice(begin, end),
+        begin_int: totals.begin_int.slice(begin, end),
+        end_int: totals.end_int.slice(begin, end),
+        rows: totals.rows[position],
+        ep_passes: totals.ep_passes[position],
+        lobbyists: Number.isInteger(lobbyists) ? lobbyists.toFixed(1) : String(lobbyists)
+    };
+}
+
+// Fill the totals per year in a copy of the explore plot without data, with the average as the point and the minimum
+// and the maximum as the error bars.
+function explore_plot(bundle, totals) {
+    const figure = JSON.parse(JSON.stringify(bundle.figure));
+    const trace = figure.data[0];
+    const middle_int = totals ? totals.begin_int.map(function(begin_int, i) {
+        return (begin_int + totals.end_int[i]) / 2;
+    }) : [];
+    trace.x = totals ? totals.years.map(function(year) {
+        return String(bundle.min_year + year);
+    }) : [];
+    trace.y = middle_int;
+    trace.error_y.array = middle_int.map(function(middle, i) {
+        return totals.end_int[i] - middle;
+    });
+    trace.error_y.arrayminus = middle_int.map(function(middle, i) {
+        return middle - totals.begin_int[i];
+    });
+    return figure;
+}
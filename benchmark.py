@@ -0,0 +1,777 @@
+import argparse
+import contextlib
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+import comparer_plots
+import explorer_plots
+import preprocessing
+import world_plots
+from data_loader import DataLoader
+
+
+def time_function(function, repeat=3):
+    """
+    Method to time a function a number of times and keep the fastest run.
+    Args:
+        function (Callable): The function without arguments that needs to be timed.
+        repeat (Int): The number of times the function is executed.
+    Returns:
+        best_time (Float): The fastest execution time in seconds.
+        result (Any): The result of the last execution of the function.
+    """
+    best_time = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best_time = min(best_time, time.perf_counter() - start)
+    return best_time, result
+
+
+def load_lobbying_costs():
+    """
+    Method to read the lobbying costs of all the category files in the data folder into a single dataframe.
+    Returns:
+        df (dataframe): Dataframe with a single column that contains all the lobbying costs.
+    """
+    file_names = sorted(glob.glob('./data/*/category/*/*.csv'))
+    dataframes = [pd.read_csv(file_name, dtype=preprocessing.columns, usecols=[preprocessing.lobbying_costs_str])
+                  for file_name in file_names]
+    return pd.concat(dataframes, ignore_index=True)
+
+
+def per_row_intervals(df):
+    """
+    Method that generates the intervals row by row, the way the preprocessing used to do it.
+    Args:
+        df (dataframe): Dataframe which contains the lobbying costs.
+    Returns:
+        df (dataframe): Dataframe with the begin and end values of the intervals added.
+    """
+    df = df.copy()
+    df[preprocessing.begin_interval_name] = 0
+    df[preprocessing.end_interval_name] = 0
+    for index, row in df.iterrows():
+        begin_int, end_int = preprocessing.generate_interval(row[preprocessing.lobbying_costs_str])
+        df.at[index, preprocessing.begin_interval_name] = begin_int
+        df.at[index, preprocessing.end_interval_name] = end_int
+    return df
+
+
+def column_intervals(df):
+    """
+    Method that generates the intervals for the complete column at once with generate_intervals.
+    Args:
+        df (dataframe): Dataframe which contains the lobbying costs.
+    Returns:
+        df (dataframe): Dataframe with the begin and end values of the intervals added.
+    """
+    df = df.copy()
+    begin_int, end_int, _ = preprocessing.generate_intervals(df[preprocessing.lobbying_costs_str])
+    df[preprocessing.begin_interval_name] = begin_int
+    df[preprocessing.end_interval_name] = end_int
+    return df
+
+
+# Lobbying costs with other whitespace and separators than the downloaded data has, on which both interval parsings
+# must give the same intervals.
+interval_edge_cases = ['<\xa0100', '>\t2,500', '\xa0 10,000 - 24,999 ', '1-2-3', '100-200-', 'no figure available']
+
+# Lobbying costs with non-ASCII digits, which the column-wise interval parsing reports as errors.
+interval_error_cases = ['\u0661\u0660\u0660', '<\u0661\u0660\u0660']
+
+
+def check_interval_edge_cases():
+    """
+    Check that the column-wise interval parsing gives the same intervals as the per row parsing on the edge cases, and
+    that it reports the lobbying costs with non-ASCII digits as errors instead of failing on them.
+    """
+    df = pd.DataFrame({preprocessing.lobbying_costs_str: interval_edge_cases})
+    pd.testing.assert_frame_equal(per_row_intervals(df), column_intervals(df))
+    _, _, errors = preprocessing.generate_intervals(pd.Series(interval_error_cases))
+    assert errors == interval_error_cases, errors
+
+
+def bench_intervals(repeat):
+    """
+    Benchmark the per row interval parsing against the column-wise interval parsing, after checking that both give the
+    same intervals on the edge cases.
+    Args:
+        repeat (Int): The number of times each variant is executed.
+    Returns:
+        results (dict): The timings of both variants in seconds.
+    """
+    check_interval_edge_cases()
+    df = load_lobbying_costs()
+    per_row_time, per_row_df = time_function(lambda: per_row_intervals(df), repeat)
+    column_time, column_df = time_function(lambda: column_intervals(df), repeat)
+    pd.testing.assert_frame_equal(per_row_df, column_df)
+    return {'rows': len(df), 'per_row': per_row_time, 'column': column_time}
+
+
+# Script that loads a preprocessed file in a fresh process and prints the load time, the increase of the peak RSS
+# (in kilobytes) and the deep memory usage of the dataframe (in bytes). The libraries are imported for both formats,
+# so only the loading of the data itself is measured.
+load_script = """
+import resource
+import sys
+import time
+import pandas as pd
+import pyarrow
+readers = {'csv': pd.read_csv, 'parquet': pd.read_parquet}
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+df = readers[sys.argv[1]](sys.argv[2])
+load_time = time.perf_counter() - start
+rss_increase = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+print(load_time, rss_increase, df.memory_usage(deep=True).sum())
+"""
+
+
+def measure_load(file_format, file_name):
+    """
+    Method to measure the loading of a preprocessed file in a fresh process, so the measurements are not influenced
+    by earlier loads.
+    Args:
+        file_format (Str): The format of the file ('csv' or 'parquet').
+        file_name (Str): The path of the file.
+    Returns:
+        load_time (Float): The time it took to load the file in seconds.
+        rss_increase (Int): The increase of the peak resident set size in kilobytes.
+        memory_usage (Int): The deep memory usage of the loaded dataframe in bytes.
+    """
+    output = subprocess.run([sys.executable, '-c', load_script, file_format, file_name],
+                            check=True, capture_output=True, text=True).stdout
+    load_time, rss_increase, memory_usage = output.split()
+    return float(load_time), int(rss_increase), int(memory_usage)
+
+
+def bench_loader(repeat):
+    """
+    Benchmark loading the preprocessed data from the CSV file against loading it from the Parquet file.
+    Both files need to be generated first by running preprocessing.py.
+    Args:
+        repeat (Int): The number of times each file is loaded.
+    Returns:
+        results (dict): The fastest load time in seconds, the peak RSS increase in kilobytes and the memory usage
+        of the dataframe in bytes for both formats.
+    """
+    results = {}
+    for file_format, file_name in [('csv', preprocessing.cat_file_name),
+                                   ('parquet', preprocessing.cat_parquet_file_name)]:
+        measurements = [measure_load(file_format, file_name) for _ in range(repeat)]
+        results[file_format + '_load_time'] = min(measurement[0] for measurement in measurements)
+        results[file_format + '_rss_increase_kb'] = min(measurement[1] for measurement in measurements)
+        results[file_format + '_memory_usage'] = measurements[0][2]
+    return results
+
+
+def bench_filters(repeat):
+    """
+    Benchmark callback-style lookups of countries, sub categories and organisations with a full column scan (isin)
+    against the lookups with the indexes of the DataLoader.
+    Args:
+        repeat (Int): The number of times each set of lookups is executed.
+    Returns:
+        results (dict): The timings of both variants for every column in seconds.
+    """
+    data = DataLoader()
+    lookups = {
+        'country head office': [[country] for country in data.countries_lst[:50]],
+        'sub_cat': [[sub_category] for sub_category in data.sub_categories_lst],
+        'organisation name': [[data.get_organisation_value(organisation)]
+                              for organisation in data.organisations_lst[::500]]
+    }
+
+    results = {}
+    for column, selections in lookups.items():
+        key_column = data.key_column(column)
+        scan_time, scan_dfs = time_function(
+            lambda: [data.data[data.data[key_column].isin(selection)] for selection in selections], repeat)
+        index_time, index_dfs = time_function(
+            lambda: [data.get_indexed_data(column, selection) for selection in selections], repeat)
+        for scan_df, index_df in zip(scan_dfs, index_dfs):
+            pd.testing.assert_frame_equal(scan_df, index_df)
+        results[column + '_lookups'] = len(selections)
+        results[column + '_scan'] = scan_time
+        results[column + '_index'] = index_time
+    return results
+
+
+def per_group_totals(data, group_column, group_str):
+    """
+    Method that generates the totals of the compare plots per group and per year, the way the compare plots used to
+    do it.
+    Args:
+        data (dataframe): Dataframe which contains the data of the selected groups.
+        group_column (Str): The column in the data by which the totals are grouped.
+        group_str (Str): The name of the column with the groups in the result.
+    Returns:
+        df (dataframe): Dataframe with the totals of every group in every year.
+    """
+    results = []
+    for by, group in data.groupby(group_column, observed=True):
+        for year in range(preprocessing.min_year, preprocessing.max_year + 1):
+            year_data = group[group['year'] == year]
+            if year_data.empty:
+                row = [by, year, 0, 0, 0, 0.00001]
+            else:
+                lobbyists = year_data['lobbyists (FTE)'].sum()
+                meetings = year_data['# of meetings'].sum()
+                ep_passes = year_data['EP passes'].sum()
+                mid_point = year_data['end_int'].sum() - year_data['begin_int'].sum()
+                row = [by, year, lobbyists, meetings, ep_passes, mid_point]
+            results.append(row)
+
+    columns = [group_str, 'year', 'lobbyists (FTE)', '# of meetings', 'EP passes', 'Approximated spending']
+    return pd.DataFrame(results, columns=columns)
+
+
+def bench_comparer(repeat):
+    """
+    Benchmark the per group totals of the organisation compare plot against the single pass totals, for 1, 10, 50
+    and 200 selected organisations.
+    Args:
+        repeat (Int): The number of times each variant is executed.
+    Returns:
+        results (dict): The timings of both variants for every amount of organisations in seconds.
+    """
+    data = DataLoader()
+    results = {}
+    for amount in [1, 10, 50, 200]:
+        organisations = data.organisations_lst[::len(data.organisations_lst) // amount][:amount]
+        selected_data = data.get_organisations_data([data.get_organisation_value(organisation)
+                                                     for organisation in organisations])
+        per_group_time, per_group_df = time_function(
+            lambda: per_group_totals(selected_data, 'organisation name', 'Organisation'), repeat)
+        single_pass_time, single_pass_df = time_function(
+            lambda: comparer_plots.calc_totals(selected_data, 'organisation name', 'Organisation'), repeat)
+        pd.testing.assert_frame_equal(per_group_df, single_pass_df)
+        results[str(amount) + '_per_group'] = per_group_time
+        results[str(amount) + '_single_pass'] = single_pass_time
+    return results
+
+
+def bench_payload(repeat):
+    """
+    Measure the size of the layout that is sent to the browser, without compression and with the precompressed
+    encodings.
+    Args:
+        repeat (Int): The number of times the layout is requested, to time the (cached) responses.
+    Returns:
+        results (dict): The sizes of the responses in bytes and the fastest layout response time in seconds.
+    """
+    # Only imported here, because importing the app loads the data and builds the world map.
+    import imperium_app
+    client = imperium_app.app.server.test_client()
+
+    results = {}
+    for encoding in ['identity', 'gzip', 'br']:
+        response = client.get('/_dash-layout', headers={'Accept-Encoding': encoding})
+        results['layout_' + encoding] = len(response.get_data())
+    results['layout_time'], _ = time_function(
+        lambda: client.get('/_dash-layout', headers={'Accept-Encoding': 'br'}), repeat)
+    return results
+
+
+# Folder in which the synthetic datasets are generated, with one sub folder per scale that has the same layout as the
+# project folder (a data folder with the downloaded and the preprocessed files).
+synthetic_folder = './data/synthetic/'
+
+# The scales of the synthetic datasets, as multiples of the downloaded data, that are benchmarked by default.
+default_scales = [1, 10]
+
+
+@contextlib.contextmanager
+def working_directory(folder):
+    """
+    Context manager that changes the working directory, so the relative paths of the preprocessing point to the
+    files of a synthetic dataset.
+    Args:
+        folder (Str): The new working directory.
+    """
+    previous_folder = os.getcwd()
+    os.chdir(folder)
+    try:
+        yield
+    finally:
+        os.chdir(previous_folder)
+
+
+def generate_synthetic_data(scale):
+    """
+    Method to generate a synthetic dataset that is a multiple of the downloaded data. Every downloaded file is
+    repeated scale times, where every copy after the first gets other organisation names, so the amount of
+    organisations grows with the scale as well. The files are only generated once per scale.
+    Args:
+        scale (Int): The amount of copies of the downloaded data.
+    Returns:
+        folder (Str): The folder of the synthetic dataset, which has the same layout as the project folder.
+    """
+    folder = synthetic_folder + str(scale) + 'x/'
+    for year in range(preprocessing.min_year, preprocessing.max_year + 1):
+        for file_name in preprocessing.year_file_paths(year):
+            synthetic_file_name = os.path.join(folder, file_name)
+            if os.path.exists(synthetic_file_name):
+                continue
+            df = pd.read_csv(file_name, dtype=str, keep_default_na=False)
+            organisations = df[preprocessing.organisation_name_str]
+            copies = [df] + [df.assign(**{preprocessing.organisation_name_str: organisations + ' (' + str(copy) + ')'})
+                             for copy in range(1, scale)]
+            os.makedirs(os.path.dirname(synthetic_file_name), exist_ok=True)
+            pd.concat(copies).to_csv(synthetic_file_name, index=False)
+
+    # The bundled centroids are needed by the world map when the application runs on the synthetic dataset.
+    shutil.copy(preprocessing.centroids_file_name, os.path.join(folder, preprocessing.centroids_file_name))
+    return folder
+
+
+def preprocess_synthetic_data(folder):
+    """
+    Method to preprocess a synthetic dataset the way preprocessing.py does, except for geocoding new countries.
+    Args:
+        folder (Str): The folder of the synthetic dataset.
+    Returns:
+        timings (dict): The time of every phase of the preprocessing in seconds.
+    """
+    timings = {}
+    with working_directory(folder), contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        df_all, df_cat = preprocessing.generate_data()
+        timings['read'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df_all.to_csv(preprocessing.all_file_name, index=False)
+        df_cat.to_csv(preprocessing.cat_file_name, index=False)
+        timings['save_csv'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        preprocessing.save_parquet(df_all, preprocessing.all_parquet_file_name)
+        preprocessing.save_parquet(df_cat, preprocessing.cat_parquet_file_name)
+        timings['save_parquet'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        preprocessing.save_mmap(df_cat, preprocessing.cat_mmap_folder_name)
+        timings['save_mmap'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df_totals = preprocessing.generate_totals(df_cat)
+        df_totals.to_csv(preprocessing.totals_file_name, index=False)
+        df_totals.to_parquet(preprocessing.totals_parquet_file_name, index=False)
+        timings['totals'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        preprocessing.generate_countries(df_cat).to_csv(preprocessing.countries_file_name, index=False)
+        timings['countries'] = time.perf_counter() - start
+    return timings
+
+
+def prepare_synthetic_data(scale):
+    """
+    Method to get the folder of a preprocessed synthetic dataset, which is generated and preprocessed when needed.
+    Args:
+        scale (Int): The amount of copies of the downloaded data.
+    Returns:
+        folder (Str): The folder of the synthetic dataset.
+    """
+    folder = generate_synthetic_data(scale)
+    if not os.path.exists(os.path.join(folder, preprocessing.totals_parquet_file_name)):
+        preprocess_synthetic_data(folder)
+    return folder
+
+
+def synthetic_loader(scale, mmap=False):
+    """
+    Method to load a preprocessed synthetic dataset with the DataLoader.
+    Args:
+        scale (Int): The amount of copies of the downloaded data.
+        mmap (Bool): Whether the data is loaded from the memory-mapped NumPy files.
+    Returns:
+        data (DataLoader): The loaded synthetic dataset.
+    """
+    folder = prepare_synthetic_data(scale)
+    return DataLoader(os.path.join(folder, preprocessing.cat_file_name), mmap=mmap)
+
+
+def sample_selections(data, amount):
+    """
+    Method to pick countries, sub categories and organisations that are spread over the dataset. The organisations
+    are picked by the values that identify them in the dropdowns.
+    Args:
+        data (DataLoader): The loaded dataset.
+        amount (Int): The maximum amount of values that is picked of every type.
+    Returns:
+        selections (dict): The picked values by the type of the plot ('Country', 'Category' or 'Organisation').
+    """
+    def spread(values):
+        return values[::max(len(values) // amount, 1)][:amount]
+    organisations = [data.get_organisation_value(organisation) for organisation in spread(data.organisations_lst)]
+    return {'Country': spread(data.countries_lst), 'Category': spread(data.sub_categories_lst),
+            'Organisation': organisations}
+
+
+def bench_preprocessing(repeat, scales):
+    """
+    Benchmark every phase of the preprocessing of the synthetic datasets.
+    Args:
+        repeat (Int): The number of times the preprocessing is executed.
+        scales (list[Int]): The scales of the synthetic datasets.
+    Returns:
+        results (dict): The fastest time of every phase for every scale in seconds.
+    """
+    results = {}
+    for scale in scales:
+        folder = generate_synthetic_data(scale)
+        runs = [preprocess_synthetic_data(folder) for _ in range(repeat)]
+        for phase in runs[0]:
+            results[str(scale) + 'x_' + phase] = min(run[phase] for run in runs)
+    return results
+
+
+def bench_startup(repeat, scales):
+    """
+    Benchmark the start-up of the DataLoader on the synthetic datasets, from the Parquet file and from the
+    memory-mapped NumPy files.
+    Args:
+        repeat (Int): The number of times the data is loaded.
+        scales (list[Int]): The scales of the synthetic datasets.
+    Returns:
+        results (dict): The amount of rows and the fastest start-up time of both formats for every scale in seconds.
+    """
+    results = {}
+    for scale in scales:
+        prepare_synthetic_data(scale)
+        parquet_time, data = time_function(lambda: synthetic_loader(scale), repeat)
+        mmap_time, _ = time_function(lambda: synthetic_loader(scale, mmap=True), repeat)
+        results[str(scale) + 'x_rows'] = len(data.data)
+        results[str(scale) + 'x_parquet'] = parquet_time
+        results[str(scale) + 'x_mmap'] = mmap_time
+    return results
+
+
+def bench_data_filters(repeat, scales):
+    """
+    Benchmark the get_*_data methods of the DataLoader on the synthetic datasets, with a single selected value and
+    with ten selected values.
+    Args:
+        repeat (Int): The number of times each set of lookups is executed.
+        scales (list[Int]): The scales of the synthetic datasets.
+    Returns:
+        results (dict): The fastest time of every method for every scale in seconds.
+    """
+    results = {}
+    for scale in scales:
+        data = synthetic_loader(scale)
+        selections = sample_selections(data, 10)
+        methods = {'Country': data.get_countries_data, 'Category': data.get_sub_categories_data,
+                   'Organisation': data.get_organisations_data}
+        for view, method in methods.items():
+            values = selections[view]
+            key = str(scale) + 'x_' + method.__name__
+            results[key + '_single'], _ = time_function(lambda: [method([value]) for value in values], repeat)
+            results[key + '_multiple'], _ = time_function(lambda: method(values), repeat)
+    return results
+
+
+def bench_plots(repeat, scales):
+    """
+    Benchmark the plot builders on the synthetic datasets: the explore plots, the compare plots with ten selected
+    values and the world map.
+    Args:
+        repeat (Int): The number of times each plot is built.
+        scales (list[Int]): The scales of the synthetic datasets.
+    Returns:
+        results (dict): The fastest build time of every plot for every scale in seconds.
+    """
+    results = {}
+    for scale in scales:
+        data = synthetic_loader(scale)
+        selections = sample_selections(data, 10)
+        columns = {'Country': 'country head office', 'Category': 'sub_cat', 'Organisation': 'organisation name'}
+        compare_data = {'Country': data.get_countries_data(selections['Country']),
+                        'Category': data.get_sub_categories_data(selections['Category']),
+                        'Organisation': data.get_organisations_data(selections['Organisation'])}
+        for view, column in columns.items():
+            totals = data.get_totals(column, selections[view][0])
+            results[str(scale) + 'x_explore_' + view.lower()], _ = time_function(
+                lambda: explorer_plots.explore_totals(totals), repeat)
+            results[str(scale) + 'x_compare_' + view.lower()], _ = time_function(
+                lambda: comparer_plots.compare_data(compare_data[view], view), repeat)
+
+        iso3_codes, amounts, countries = data.get_country_amount_of_organisations()
+        results[str(scale) + 'x_world_map'], _ = time_function(
+            lambda: world_plots.map_plot(iso3_codes, amounts, countries), repeat)
+    return results
+
+
+def callback_request(client, outputs, inputs, changed):
+    """
+    Method to invoke a callback of the application through the Dash test client, the way the browser does.
+    Args:
+        client (FlaskClient): The test client of the application.
+        outputs (list[Str]): The outputs of the callback as 'id.property'.
+        inputs (dict): The values of the inputs of the callback by 'id.property', in the order of the callback.
+        changed (Str): The input that triggers the callback as 'id.property'.
+    Returns:
+        size (Int): The size of the response in bytes.
+    """
+    def split(prop_id):
+        component_id, component_property = prop_id.rsplit('.', 1)
+        return {'id': component_id, 'property': component_property}
+
+    output = '..' + '...'.join(outputs) + '..' if len(outputs) > 1 else outputs[0]
+    response = client.post('/_dash-update-component', json={
+        'output': output,
+        'outputs': [split(prop_id) for prop_id in outputs] if len(outputs) > 1 else split(outputs[0]),
+        'inputs': [dict(split(prop_id), value=value) for prop_id, value in inputs.items()],
+        'changedPropIds': [changed]
+    })
+    if response.status_code != 200:
+        raise RuntimeError('Callback ' + output + ' failed with status ' + str(response.status_code))
+    return len(response.get_data())
+
+
+def time_callbacks(repeat):
+    """
+    Method to time the callbacks of the application end-to-end, from the request to the serialized response. It
+    imports the application, so it needs to run in a fresh process in the folder of the dataset.
+    Args:
+        repeat (Int): The number of times each callback is invoked.
+    Returns:
+        results (dict): The fastest response time in seconds and the response size in bytes of every callback.
+    """
+    start = time.perf_counter()
+    import imperium_app
+    results = {'import': time.perf_counter() - start}
+
+    client = imperium_app.app.server.test_client()
+    selections = sample_selections(imperium_app.get_data(), 10)
+    explore_outputs = ['info-card.children', 'info-card-2.children', 'selected-country.children',
+                       'explore-plot.figure']
+    # The explore dropdown, the compare dropdown and the view of every type of selection
+    dropdowns = {'country': ('countries-dropdown.value', 'compare-countries', 'Country'),
+                 'organisation': ('organisations-dropdown.value', 'compare-organisations', 'Organisation'),
+                 'category': ('sub-categories-dropdown.value', 'compare-categories', 'Category')}
+
+    requests = {}
+    for name, (dropdown, compare_id, view) in dropdowns.items():
+        explore_inputs = {prop_id: None for prop_id, _, _ in dropdowns.values()}
+        explore_inputs[dropdown] = selections[view][0]
+        requests['explore_' + name] = (explore_outputs, explore_inputs, dropdown)
+        requests['compare_' + name] = ([compare_id + '-plot.figure'],
+                                       {compare_id + '-dropdown.value': selections[view]},
+                                       compare_id + '-dropdown.value')
+
+    # Only a selected country changes the world map.
+    requests['map_country'] = (['world-map.figure'], {'countries-dropdown.value': selections['Country'][0]},
+                               'countries-dropdown.value')
+
+    for name, (outputs, inputs, changed) in requests.items():
+        results[name], size = time_function(lambda: callback_request(client, outputs, inputs, changed), repeat)
+        results[name + '_size'] = size
+    return results
+
+
+def bench_callbacks(repeat, scales):
+    """
+    Benchmark the callbacks of the application end-to-end on the synthetic datasets through the Dash test client.
+    Every scale runs in a fresh process without the figure cache, so every request builds its figures.
+    Args:
+        repeat (Int): The number of times each callback is invoked.
+        scales (list[Int]): The scales of the synthetic datasets.
+    Returns:
+        results (dict): The import time of the application, and the fastest response time in seconds and the response
+        size in bytes of every callback for every scale.
+    """
+    project_folder = os.path.dirname(os.path.abspath(__file__))
+    environment = dict(os.environ, PYTHONPATH=project_folder, IMPERIUM_FIGURE_CACHE_SIZE='0')
+    results = {}
+    for scale in scales:
+        folder = prepare_synthetic_data(scale)
+        output = subprocess.run(
+            [sys.executable, '-c', 'import json, benchmark; print(json.dumps(benchmark.time_callbacks(%d)))' % repeat],
+            cwd=folder, env=environment, check=True, capture_output=True, text=True).stdout
+        for key, value in json.loads(output.splitlines()[-1]).items():
+            results[str(scale) + 'x_' + key] = value
+    return results
+
+
+# Script that imports the application in a fresh process, requests the page and then the layout, and prints the
+# import time, the time until the first response and the time of the layout request in seconds.
+cold_start_script = """
+import json
+import time
+start = time.perf_counter()
+import imperium_app
+timings = {'import': time.perf_counter() - start}
+client = imperium_app.app.server.test_client()
+client.get('/')
+timings['first_response'] = time.perf_counter() - start
+layout_start = time.perf_counter()
+client.get('/_dash-layout', headers={'Accept-Encoding': 'br'})
+timings['layout'] = time.perf_counter() - layout_start
+print(json.dumps(timings))
+"""
+
+
+def measure_cold_start(folder, lazy):
+    """
+    Method to measure the cold start of the application in a fresh process with an import time profile
+    (python -X importtime).
+    Args:
+        folder (Str): The folder of the dataset.
+        lazy (Bool): Whether the application is started in the lazy startup mode.
+    Returns:
+        timings (dict): The import time, the time until the first response and the time of the layout request in
+        seconds.
+        import_profile (dict): The cumulative import time in seconds of every module that the application imports
+        directly.
+    """
+    project_folder = os.path.dirname(os.path.abspath(__file__))
+    environment = dict(os.environ, PYTHONPATH=project_folder, IMPERIUM_LAZY_STARTUP='1' if lazy else '0')
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', cold_start_script],
+                             cwd=folder, env=environment, check=True, capture_output=True, text=True)
+
+    # Every imported module is listed after the modules that it imports, which are indented one level deeper.
+    import_profile = {}
+    imported_modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        level = (len(module) - len(module.lstrip())) // 2
+        if level == 1:
+            imported_modules[module.strip()] = int(cumulative) / 1e6
+        elif level == 0:
+            if module.strip() == 'imperium_app':
+                import_profile = imported_modules
+            imported_modules = {}
+    return json.loads(process.stdout.splitlines()[-1]), import_profile
+
+
+def bench_cold_start(repeat, scales):
+    """
+    Benchmark the cold start of the application on the synthetic datasets, with all the data loaded at import and in
+    the lazy startup mode. The layout request is measured without compressed layouts in the snapshot folder (cold) and
+    with them (warm). The import time profile of the fastest warm start is part of the results.
+    Args:
+        repeat (Int): The number of warm starts of which the fastest is kept.
+        scales (list[Int]): The scales of the synthetic datasets.
+    Returns:
+        results (dict): The timings in seconds of the cold and warm starts of both modes for every scale, and the
+        cumulative import times of the modules that the application imports directly.
+    """
+    results = {}
+    for scale in scales:
+        folder = prepare_synthetic_data(scale)
+        for mode, lazy in [('eager', False), ('lazy', True)]:
+            for snapshot_file in glob.glob(os.path.join(folder, 'data', 'cache', 'layout_*')):
+                os.remove(snapshot_file)
+            cold_timings, _ = measure_cold_start(folder, lazy)
+            warm_starts = [measure_cold_start(folder, lazy) for _ in range(repeat)]
+            timings, import_profile = min(warm_starts, key=lambda start: start[0]['first_response'])
+
+            key = str(scale) + 'x_' + mode + '_'
+            results[key + 'import'] = timings['import']
+            results[key + 'first_response'] = timings['first_response']
+            results[key + 'layout_cold'] = cold_timings['layout']
+            results[key + 'layout_warm'] = timings['layout']
+            for module, cumulative in sorted(import_profile.items(), key=lambda item: -item[1])[:10]:
+                results[key + 'import_' + module] = cumulative
+    return results
+
+
+def benchmark_metadata(args):
+    """
+    Method to describe the environment of a benchmark run, so stored results can be compared over time.
+    Args:
+        args (Namespace): The arguments with which the benchmarks were run.
+    Returns:
+        metadata (dict): The date, the commit, the versions and the arguments of the run.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'pandas': pd.__version__,
+            'repeat': args.repeat, 'scales': args.scales}
+
+
+def compare_results(previous_results, results):
+    """
+    Method to print the relative change of every measurement compared to the results of a previous run.
+    Args:
+        previous_results (dict): The results of the previous run by benchmark name.
+        results (dict): The results of this run by benchmark name.
+    """
+    for name, measurements in results.items():
+        for key, value in measurements.items():
+            previous_value = previous_results.get(name, {}).get(key)
+            if isinstance(previous_value, (int, float)) and previous_value:
+                print('    ', name, key, ': ', previous_value, ' -> ', value,
+                      ' ({:+.1%})'.format((value - previous_value) / previous_value))
+
+
+# All available benchmarks on the downloaded data by name
+benchmarks = {
+    'intervals': bench_intervals,
+    'loader': bench_loader,
+    'filters': bench_filters,
+    'comparer': bench_comparer,
+    'payload': bench_payload
+}
+
+# All available benchmarks on the synthetic datasets by name
+synthetic_benchmarks = {
+    'preprocessing': bench_preprocessing,
+    'startup': bench_startup,
+    'data_filters': bench_data_filters,
+    'plots': bench_plots,
+    'callbacks': bench_callbacks,
+    'cold_start': bench_cold_start
+}
+
+
+if __name__ == "__main__":
+    names = list(benchmarks.keys()) + list(synthetic_benchmarks.keys())
+    parser = argparse.ArgumentParser(description='Run the Imperium benchmarks.')
+    parser.add_argument('names', nargs='*', default=names, choices=names,
+                        help='The benchmarks to run (default: all).')
+    parser.add_argument('--repeat', type=int, default=3, help='The number of runs per measurement.')
+    parser.add_argument('--scales', type=int, nargs='+', default=default_scales,
+                        help='The scales of the synthetic datasets as multiples of the downloaded data (default: 1 10).')
+    parser.add_argument('--output', help='JSON file in which the results are stored.')
+    parser.add_argument('--compare', help='JSON file with the results of a previous run to compare with.')
+    args = parser.parse_args()
+
+    all_results = {}
+    for name in args.names:
+        print('Running benchmark: ', name)
+        if name in synthetic_benchmarks:
+            all_results[name] = synthetic_benchmarks[name](args.repeat, args.scales)
+        else:
+            all_results[name] = benchmarks[name](args.repeat)
+        for key, value in all_results[name].items():
+            print('    ', key, ': ', value)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'metadata': benchmark_metadata(args), 'results': all_results}, file, indent=4, default=float)
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous_run = json.load(file)
+        print('Compared with: ', args.compare, ' (', previous_run['metadata']['date'], ')')
+        compare_results(previous_run['results'], all_results)
@@ -0,0 +1,208 @@
+import collections
+import contextlib
+import threading
+import time
+
+import flask
+
+# The phases in which the time of a callback request is split. The serialization phase is the time of the request
+# that is not spent in one of the other phases, which is mostly the serialization of the response by Dash.
+phases = ['filter', 'aggregation', 'figure', 'serialization']
+
+# The quantiles that are reported of every measurement
+quantiles = [0.5, 0.95, 0.99]
+
+
+class CallbackMetrics:
+    """
+    Opt-in instrumentation of the Dash callbacks. For every callback request the time spent in every phase, the total
+    time, the size of the response and the hits and misses of the figure cache are recorded. The measurements are
+    exposed in the Prometheus text format and summarized in the log.
+    """
+
+    def __init__(self, enabled=False, log_interval=60, max_samples=1000):
+        self.enabled = enabled
+        self.log_interval = log_interval
+        self.max_samples = max_samples
+        self.callback_names = {}
+        self.samples = collections.defaultdict(lambda: collections.deque(maxlen=self.max_samples))
+        self.sums = collections.Counter()
+        self.counts = collections.Counter()
+        self.lock = threading.Lock()
+        self.last_summary = time.monotonic()
+
+    def init_app(self, app):
+        """
+        This method registers the request hooks that measure the callback requests of a Dash app and the endpoint
+        that exposes the measurements. Nothing is registered when the instrumentation is disabled.
+        :param app: The Dash app.
+        """
+        if not self.enabled:
+            return
+        # Clientside callbacks run in the browser and have no Python function.
+        self.callback_names = {output: callback['callback'].__name__ for output, callback in app.callback_map.items()
+                               if 'callback' in callback}
+        app.server.before_request(self.start_request)
+        app.server.after_request(self.finish_request)
+        app.server.add_url_rule('/metrics', 'metrics', self.serve_metrics)
+
+    @staticmethod
+    def current_request():
+        """
+        This method gets the measurements of the callback request that is being handled.
+        :return: A dictionary with the measurements, or None when no callback request is being handled.
+        """
+        if flask.has_request_context():
+            return flask.g.get('callback_metrics')
+        return None
+
+    def start_request(self):
+        """
+        This method starts the measurements of a request, when it is a callback request.
+        """
+        if flask.request.path.endswith('/_dash-update-component'):
+            output = flask.request.get_json(silent=True, cache=True) or {}
+            flask.g.callback_metrics = {'callback': self.callback_names.get(output.get('output'), output.get('output')),
+                                        'start': time.perf_counter(), 'phases': collections.Counter(),
+                                        'cache_hits': 0, 'cache_misses': 0}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        This method measures the time spent in a phase of the callback request that is being handled. It does
+        nothing when the instrumentation is disabled or when no callback request is being handled.
+        :param name: The name of the phase ('filter', 'aggregation' or 'figure').
+        """
+        current = self.current_request() if self.enabled else None
+        if current is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current['phases'][name] += time.perf_counter() - start
+
+    def record_cache_lookup(self, hit):
+        """
+        This method records a lookup in the figure cache for the callback request that is being handled.
+        :param hit: Whether the figure was found in the cache.
+        """
+        current = self.current_request() if self.enabled else None
+        if current is not None:
+            current['cache_hits' if hit else 'cache_misses'] += 1
+
+    def finish_request(self, response):
+        """
+        This method finishes the measurements of a callback request and adds them to the recorded measurements.
+        :param response: The response of the request.
+        :return: The unchanged response.
+        """
+        current = self.current_request()
+        if current is None:
+            return response
+
+        total = time.perf_counter() - current['start']
+        current['phases']['serialization'] = max(total - sum(current['phases'].values()), 0)
+        callback = current['callback']
+        measurements = {(callback, 'seconds', phase): current['phases'][phase] for phase in phases}
+        measurements[(callback, 'seconds', 'total')] = total
+        measurements[(callback, 'bytes', 'response')] = len(response.get_data())
+        with self.lock:
+            for key, value in measurements.items():
+                self.samples[key].append(value)
+                self.sums[key] += value
+                self.counts[key] += 1
+            self.counts[(callback, 'cache', 'hits')] += current['cache_hits']
+            self.counts[(callback, 'cache', 'misses')] += current['cache_misses']
+            log_summary = time.monotonic() - self.last_summary >= self.log_interval
+            if log_summary:
+                self.last_summary = time.monotonic()
+
+        if log_summary:
+            self.print_summary()
+        return response
+
+    @staticmethod
+    def quantile(samples, q):
+        """
+        This method computes a quantile of samples with the nearest-rank method.
+        :param samples: The samples.
+        :param q: The quantile between 0 and 1.
+        :return: The quantile of the samples.
+        """
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def summary(self):
+        """
+        This method summarizes the recent measurements of every callback.
+        :return: A dictionary with the callbacks as keys and dictionaries with the quantiles of every measurement,
+        the amount of requests and the cache hits and misses as values.
+        """
+        with self.lock:
+            samples = {key: list(values) for key, values in self.samples.items()}
+            counts = dict(self.counts)
+
+        summary = collections.defaultdict(dict)
+        for (callback, unit, name), values in samples.items():
+            summary[callback][name] = [self.quantile(values, q) for q in quantiles]
+            if name == 'total':
+                summary[callback]['requests'] = counts[(callback, unit, name)]
+        for (callback, unit, name), count in counts.items():
+            if unit == 'cache':
+                summary[callback]['cache_' + name] = count
+        return dict(summary)
+
+    def print_summary(self):
+        """
+        This method prints the p50, p95 and p99 of the time of every phase and of the size of the response of every
+        callback.
+        """
+        print('Callback metrics (p50 / p95 / p99): ')
+        for callback, measurements in sorted(self.summary().items()):
+            print('    ', callback, ': ', measurements['requests'], ' requests, ',
+                  measurements['cache_hits'], ' cache hits, ', measurements['cache_misses'], ' cache misses')
+            for name in phases + ['total']:
+                print('        ', name, ': ', ' / '.join('{:.1f} ms'.format(value * 1000)
+                                                        for value in measurements[name]))
+            print('        ', 'response: ', ' / '.join('{:.0f} bytes'.format(value)
+                                                       for value in measurements['response']))
+
+    def serve_metrics(self):
+        """
+        This method serves the measurements in the Prometheus text format.
+        :return: The response with the measurements.
+        """
+        with self.lock:
+            samples = {key: list(values) for key, values in self.samples.items()}
+            sums = dict(self.sums)
+            counts = dict(self.counts)
+
+        metrics = {'seconds': ('imperium_callback_duration_seconds', 'phase',
+                               'Time spent in the phases of the callback requests.'),
+                   'bytes': ('imperium_callback_response_bytes', 'type', 'Size of the responses of the callbacks.')}
+        lines = []
+        for unit, (metric, label, description) in metrics.items():
+            lines.append('# HELP ' + metric + ' ' + description)
+            lines.append('# TYPE ' + metric + ' summary')
+            for (callback, key_unit, name), values in sorted(samples.items()):
+                if key_unit != unit:
+                    continue
+                labels = 'callback="' + callback + '",' + label + '="' + name + '"'
+                for q in quantiles:
+                    lines.append(metric + '{' + labels + ',quantile="' + str(q) + '"} ' +
+                                 repr(float(self.quantile(values, q))))
+                lines.append(metric + '_sum{' + labels + '} ' + repr(float(sums[(callback, key_unit, name)])))
+                lines.append(metric + '_count{' + labels + '} ' + str(counts[(callback, key_unit, name)]))
+
+        for name in ['hits', 'misses']:
+            metric = 'imperium_figure_cache_' + name + '_total'
+            lines.append('# HELP ' + metric + ' Lookups in the figure cache by the callbacks that were ' +
+                         ('found' if name == 'hits' else 'not found') + '.')
+            lines.append('# TYPE ' + metric + ' counter')
+            for (callback, unit, key_name), count in sorted(counts.items()):
+                if unit == 'cache' and key_name == name:
+                    lines.append(metric + '{callback="' + callback + '"} ' + str(count))
+
+        return flask.Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
@@ -1,39 +1,81 @@
+import numpy as np
 import pandas as pd
-import plotly.express as px
 
+from preprocessing import max_year, min_year
 
-def calc_totals(grouped_df, group_str):
+
+def calc_totals(data, group_column, group_str):
     """
     Method to create a pandas dataframe with all the nessecary data to generate
-    the bubble chart plots in the compare_data method bellow.
+    the bubble chart plots in the compare_data method bellow. The totals of every group
+    in every year are summed in a single pass over the data. Years without data get a
+    tiny approximated spending, so the bubble still exists in the animation.
     Args:
-        grouped_df (dataframe): Dataframe which contains the data from the countries,
+        data (dataframe): Dataframe which contains the data from the countries,
                             organisations or categories.
+        group_column (Str): The column in the data by which the totals are grouped.
         group_str (Str): The selected type for which the data needs to be created 
                     (Country, Organisation or Category).
     Returns:
-        Fig (Figure): Returns the correct bubble chart plot.
+        df (dataframe): Dataframe with the totals of every group in every year.
     """
-    results = []
-    for _, (by, group) in enumerate(grouped_df):
-        if not group.empty:
-            for year in range(2012, 2022):
-                year_data = group[group['year'] == year]
-                if year_data.empty:
-                    data = [by, year, 0, 0, 0, 0.00001]
-                else:
-                    lobbyists = year_data['lobbyists (FTE)'].sum()
-                    meetings = year_data['# of meetings'].sum()
-                    ep_passes = year_data['EP passes'].sum()
-                    mid_point = year_data['end_int'].sum() - year_data['begin_int'].sum()
-                    data = [by, year, lobbyists, meetings, ep_passes, mid_point]
-                results.append(data)
+    amount_years = max_year - min_year + 1
+    codes, groups = pd.factorize(data[group_column], sort=True)
+    years = np.asarray(data['year'], dtype='int64') - min_year
+    in_range = (codes >= 0) & (years >= 0) & (years < amount_years)
+    cells = codes[in_range] * amount_years + years[in_range]
+    amount_cells = len(groups) * amount_years
+
+    def sum_cells(column):
+        weights = np.asarray(data[column], dtype='float64')[in_range]
+        return np.bincount(cells, weights=weights, minlength=amount_cells)
 
-    columns = [group_str, 'year', 'lobbyists (FTE)', '# of meetings', 'EP passes', 'Approximated spending']
-    df = pd.DataFrame(results, columns=columns)
+    missing = np.bincount(cells, minlength=amount_cells) == 0
+    spending = sum_cells('end_int') - sum_cells('begin_int')
+    if missing.any():
+        spending[missing] = 0.00001
+    else:
+        spending = spending.astype('int64')
+
+    df = pd.DataFrame({
+        group_str: np.repeat(np.asarray(groups, dtype=object), amount_years),
+        'year': np.tile(np.arange(min_year, max_year + 1), len(groups)),
+        'lobbyists (FTE)': sum_cells('lobbyists (FTE)'),
+        '# of meetings': sum_cells('# of meetings').astype('int64'),
+        'EP passes': sum_cells('EP passes').astype('int64'),
+        'Approximated spending': spending
+    })
     return df
 
 
+def compare_totals(data, view):
+    """
+    Method to compute the totals of every group in every year for the bubble chart
+    of the selected type. Organisations are grouped by their ID when the data has IDs,
+    their names are only looked up for the grouped totals.
+    Args:
+        data (dataframe): Dataframe which contains the data from the countries,
+                            organisations or categories.
+        view (Str): The selected type for which the plot needs to be created
+                    (Country, Organisation or Category).
+    Returns:
+        df (dataframe): Dataframe with the totals of every group in every year.
+    """
+    if view == 'Country':
+        return calc_totals(data, 'country head office', 'Country')
+    elif view == 'Organisation':
+        if 'organisation_id' not in data.columns:
+            return calc_totals(data, 'organisation name', 'Organisation')
+        df = calc_totals(data, 'organisation_id', 'Organisation')
+        organisations = data.drop_duplicates(subset='organisation_id')
+        names = dict(zip(organisations['organisation_id'], organisations['organisation name']))
+        df['Organisation'] = df['Organisation'].map(names)
+        # Keep the organisations in the order of their names, like when they are grouped by name.
+        return df.sort_values(by='Organisation', kind='mergesort').reset_index(drop=True)
+    else:
+        return calc_totals(data, 'sub_cat', 'Category')
+
+
 def compare_data(data, view):
     """
     Method to create a plotly animated bubble chart where the size of the bubble
@@ -48,15 +90,22 @@ def compare_data(data, view):
     Returns:
         Fig (Figure): Returns the correct bubble chart plot.
     """
-    if view == 'Country':
-        data_grouped = data.groupby(['country head office'])
-        result_df = calc_totals(data_grouped, 'Country')
-    elif view == 'Organisation':
-        data_grouped = data.groupby(['organisation name'])
-        result_df = calc_totals(data_grouped, 'Organisation')
-    else:
-        data_grouped = data.groupby(['sub_cat'])
-        result_df = calc_totals(data_grouped, 'Category')
+    return compare_plot(compare_totals(data, view), view)
+
+
+def compare_plot(result_df, view):
+    """
+    Method to create the animated bubble chart of compare_data from the totals
+    that were computed by compare_totals.
+    Args:
+        result_df (dataframe): Dataframe with the totals of every group in every year.
+        view (Str): The selected type for which the plot needs to be created
+                    (Country, Organisation or Category).
+    Returns:
+        Fig (Figure): Returns the correct bubble chart plot.
+    """
+    # Only imported here, because importing Plotly Express takes long and the compare plots are not needed at start-up.
+    import plotly.express as px
 
     if result_df.empty:
         fig = px.scatter(result_df, x="lobbyists (FTE)", y="# of meetings", size="Approximated spending",
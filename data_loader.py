@@ -1,5 +1,13 @@
+import bisect
+import json
+import os
+import unicodedata
+
+import numpy as np
 import pandas as pd
-import country_converter as coco
+
+from preprocessing import (atomic_write, content_hash, generate_totals, list_countries, min_year,
+                           remove_outdated_files)
 
 
 class DataLoader:
@@ -7,8 +15,18 @@ class DataLoader:
     A class to load preprocessed data from a file and then make it available for fast access to other processes.
     """
 
-    def __init__(self, file='data/data_cat.csv'):
-        self.data = pd.read_csv(file)
+    def __init__(self, file='data/data_cat.csv', mmap=False, compact=False):
+        self.path = self.data_path(file, mmap)
+        if mmap:
+            self.data = self.load_mmap(self.path)
+        else:
+            self.data = self.load_data(self.path)
+        # The memory-mapped data is already dictionary encoded, converting it would copy it into private memory.
+        if compact and not mmap:
+            self.data = self.compact_data(self.data)
+        self.version = content_hash(self.path)
+        self.cache_folder = os.path.join(os.path.dirname(self.path), 'cache')
+        self.countries_file = os.path.join(os.path.dirname(self.path), 'countries.csv')
         self.columns = ['organisation name', 'country head office', 'lobbying costs', 'EP passes', 'lobbyists (FTE)',
                         '# of meetings', 'registered date', 'begin_int', 'end_int', 'year', 'main_cat', 'sub_cat']
         self.main_categories_lst = ['Professional consultancies/law firms/self-employed consultants',
@@ -24,35 +42,349 @@ class DataLoader:
                                    'Think tanks and research institutions', 'Academic institutions',
                                    'Organisations representing churches and religious communities',
                                    'Regional structures', 'Other sub-national public authorities']
+        # The organisations are identified by their ID when the preprocessing added it, otherwise by their name.
+        self.organisation_column = 'organisation_id' if 'organisation_id' in self.data.columns else 'organisation name'
+        self.organisation_names = self.load_organisation_names()
+        self.organisation_ids = {name: value for value, name in self.organisation_names.items()}
         self.organisations_lst = self.load_organisations()
+        self.organisations_search_index = self.load_search_index()
         self.countries_lst = self.load_countries()
+        self.iso3_codes = self.load_iso3_codes()
+        self.indexes = {column: self.load_index(self.key_column(column))
+                        for column in ['country head office', 'sub_cat', 'organisation name']}
+        self.totals = self.load_totals()
+        self.totals_index = self.load_totals_index()
+        self.info_totals = {column: self.load_info_totals(column)
+                            for column in ['country head office', 'sub_cat', 'organisation name']}
+
+    @staticmethod
+    def data_path(file, mmap):
+        """
+        This method determines the path from which the preprocessed data is loaded. When a Parquet version of the CSV
+        file exists next to it, the Parquet file is used instead, which is faster and keeps the categorical columns.
+        :param file: The path of the preprocessed CSV file.
+        :param mmap: Whether the data is loaded from the folder with memory-mappable NumPy files.
+        :return: The path of the CSV file, the Parquet file or the folder with NumPy files.
+        """
+        if mmap:
+            return os.path.splitext(file)[0] + '_mmap'
+        parquet_file = os.path.splitext(file)[0] + '.parquet'
+        if os.path.exists(parquet_file):
+            return parquet_file
+        return file
+
+    @staticmethod
+    def load_data(file):
+        """
+        This method will load the preprocessed data from a CSV or Parquet file.
+        :param file: The path of the preprocessed CSV or Parquet file.
+        :return: A dataframe with the preprocessed data.
+        """
+        if file.endswith('.parquet'):
+            return pd.read_parquet(file)
+        return pd.read_csv(file)
+
+    @staticmethod
+    def load_mmap(folder):
+        """
+        This method will load the preprocessed data from a folder with NumPy files, which are memory-mapped read-only.
+        All processes that load the same folder share the same physical memory pages, only the categories of the
+        string columns are private to each process. The numeric columns of the same type are stored in one NumPy file,
+        which becomes a single block of the dataframe. Pandas combines the columns of the same type into one block by
+        copying them, so separate columns of the same type would end up in private memory.
+        :param folder: The path of the folder with the memory-mappable NumPy files.
+        :return: A dataframe with the preprocessed data.
+        """
+        with open(os.path.join(folder, 'columns.json')) as file:
+            columns_description = json.load(file)
+
+        categorical_columns = {}
+        numeric_columns = {}
+        for description in columns_description:
+            if 'categories' in description:
+                codes = np.load(os.path.join(folder, description['file']), mmap_mode='r')
+                categorical_columns[description['name']] = pd.Categorical.from_codes(codes, description['categories'])
+            else:
+                numeric_columns.setdefault(description['file'], []).append(description)
+
+        blocks = []
+        for file_name, descriptions in numeric_columns.items():
+            values = np.load(os.path.join(folder, file_name), mmap_mode='r')
+            names = [description['name'] for description in sorted(descriptions, key=lambda column: column['row'])]
+            blocks.append(pd.DataFrame(values.T, columns=names, copy=False))
+        blocks.append(pd.DataFrame(categorical_columns, copy=False))
+        return pd.concat(blocks, axis=1, copy=False)
+
+    @staticmethod
+    def narrowest_integer_type(values, headroom=1):
+        """
+        This method determines the narrowest integer type that can hold the values, also after they are multiplied by
+        the headroom.
+        :param values: The integer values.
+        :param headroom: The factor by which the values can grow in calculations, like adding two of them.
+        :return: The name of the integer type.
+        """
+        for integer_type in ['int8', 'int16', 'int32']:
+            limits = np.iinfo(integer_type)
+            if len(values) == 0 or (values.min() * headroom >= limits.min and values.max() * headroom <= limits.max):
+                return integer_type
+        return 'int64'
+
+    @staticmethod
+    def compact_data(data):
+        """
+        This method will convert the data to a compact representation: the string columns are dictionary encoded as
+        categoricals, the registered date is parsed and the integer columns get the narrowest type that can hold them.
+        The begin and end of the lobbying costs intervals keep room for adding them, because the middle of an interval
+        is computed from their sum. The memory usage before and after the conversion is printed.
+        :param data: A dataframe with the preprocessed data.
+        :return: The dataframe in the compact representation.
+        """
+        memory_usage = data.memory_usage(deep=True).sum()
+        headrooms = {'EP passes': 1, '# of meetings': 1, 'year': 1, 'begin_int': 2, 'end_int': 2, 'organisation_id': 1}
+        columns = {}
+        for column in data.columns:
+            values = data[column]
+            if column == 'registered date':
+                values = pd.to_datetime(values)
+            elif column in headrooms:
+                integers = np.asarray(values, dtype='int64')
+                values = pd.Series(integers, index=values.index).astype(
+                    DataLoader.narrowest_integer_type(integers, headrooms[column]))
+            elif not (pd.api.types.is_numeric_dtype(values.dtype) or isinstance(values.dtype, pd.CategoricalDtype)):
+                values = values.astype('category')
+            columns[column] = values
+        data = pd.DataFrame(columns)
+
+        print('Memory usage of the data: ', round(memory_usage / 1024 / 1024, 1), ' MB, compacted: ',
+              round(data.memory_usage(deep=True).sum() / 1024 / 1024, 1), ' MB')
+        return data
+
+    def load_organisation_names(self):
+        """
+        This method will load the name of every organisation by the value that identifies it, which is its ID or,
+        when the data has no IDs, its name.
+        :return: A dictionary with the IDs or names as keys and the names as values.
+        """
+        if self.organisation_column == 'organisation name':
+            organisations = self.data['organisation name'].drop_duplicates()
+            return dict(zip(organisations, organisations))
+        organisations = self.data[[self.organisation_column, 'organisation name']].drop_duplicates(
+            subset=self.organisation_column)
+        return dict(zip(organisations[self.organisation_column], organisations['organisation name']))
 
     def load_organisations(self):
         """
         This method will load all distinct organisations in the dataset into a list.
         :return: A list of all organisations.
         """
-        organisations = self.data['organisation name']
-        organisations = organisations.drop_duplicates().to_list()
-        organisations.sort()
-        return organisations
+        return sorted(self.organisation_names.values())
+
+    def key_column(self, column):
+        """
+        This method determines the column by which the values of a column are looked up, which is the ID column for
+        the organisation names when the data has IDs.
+        :param column: The column ('country head office', 'sub_cat' or 'organisation name').
+        :return: The column by which the values are looked up.
+        """
+        if column == 'organisation name':
+            return self.organisation_column
+        return column
+
+    def get_organisation_value(self, name):
+        """
+        This method gets the value that identifies an organisation in the dropdowns and the lookups.
+        :param name: The name of the organisation.
+        :return: The ID of the organisation, or its name when the data has no IDs.
+        """
+        return self.organisation_ids.get(name, name)
+
+    def get_organisation_name(self, value):
+        """
+        This method gets the name of an organisation, which is shown instead of its ID.
+        :param value: The ID of the organisation, or its name when the data has no IDs.
+        :return: The name of the organisation, or the value as text when the organisation is unknown.
+        """
+        return self.organisation_names.get(value, str(value))
+
+    @staticmethod
+    def normalize_name(name):
+        """
+        This method will normalize a name for searching, by removing its accents and ignoring its case.
+        :param name: The name that needs to be normalized.
+        :return: The normalized name.
+        """
+        decomposed = unicodedata.normalize('NFKD', name)
+        return ''.join(character for character in decomposed if not unicodedata.combining(character)).casefold()
+
+    def load_search_index(self):
+        """
+        This method will build the index that is used to search organisations without taking accents and case into
+        account. It consists of the normalized names in sorted order together with the original names.
+        :return: A tuple with the sorted list of normalized names and the list of corresponding original names.
+        """
+        normalized_organisations = sorted((self.normalize_name(organisation), organisation)
+                                          for organisation in self.organisations_lst)
+        return [normalized for normalized, _ in normalized_organisations], \
+               [organisation for _, organisation in normalized_organisations]
+
+    def search_organisations(self, query, limit=50, insensitive=True):
+        """
+        This method searches the organisations of which the name contains a query. The organisations of which the
+        name starts with the query are found with a binary search and come first, when there are less of them than
+        the limit, they are followed by the organisations that contain the query elsewhere in their name.
+        :param query: The text that was typed in the dropdown.
+        :param limit: The maximum amount of organisations that is returned.
+        :param insensitive: Whether accents and case are ignored.
+        :return: A list with the names of at most limit organisations.
+        """
+        if insensitive:
+            query = self.normalize_name(query)
+            keys, organisations = self.organisations_search_index
+        else:
+            keys = organisations = self.organisations_lst
+
+        matches = []
+        position = bisect.bisect_left(keys, query)
+        while position < len(keys) and len(matches) < limit and keys[position].startswith(query):
+            matches.append(organisations[position])
+            position += 1
+
+        if len(matches) < limit:
+            for key, organisation in zip(keys, organisations):
+                if query in key and not key.startswith(query):
+                    matches.append(organisation)
+                    if len(matches) == limit:
+                        break
+        return matches
 
     def load_countries(self):
         """
         This method will load all distinct countries in the dataset into a list.
         :return: A list of all countries.
         """
-        countries = self.data['country head office']
-        countries = countries.dropna()
-        countries = countries.drop_duplicates().to_list()
+        return list_countries(self.data['country head office'])
 
-        # Some names were written wrong, so some hard coded solution to rename those countries.
-        countries[countries.index('Afganistan')] = 'Afghanistan'
-        countries.remove('Netherlands Antilles')
-        countries[countries.index('Gibralter')] = 'Gibraltar'
-        countries.sort()
+    def load_iso3_codes(self):
+        """
+        This method will load the ISO 3 codes of the countries, which were resolved during the preprocessing. Data
+        that was preprocessed before the codes were resolved has no file with the codes, then no codes are known.
+        :return: A dictionary with the countries as keys and their ISO 3 codes as values.
+        """
+        if not os.path.exists(self.countries_file):
+            print('WARNING: ', self.countries_file, ' does not exist, the world map shows no countries until '
+                  'preprocessing.py is ran again')
+            return {}
+        countries = pd.read_csv(self.countries_file, keep_default_na=False)
+        return dict(zip(countries['country'], countries['iso3']))
 
-        return countries
+    def load_totals(self):
+        """
+        This method will load the totals per year of every country, sub category and organisation, which were
+        computed during the preprocessing. When they are not available, they are computed from the data.
+        :return: A dataframe with the totals per dimension, value and year.
+        """
+        totals_file = self.data_path(os.path.join(os.path.dirname(self.path), 'data_totals.csv'), mmap=False)
+        if os.path.exists(totals_file):
+            return self.load_data(totals_file)
+        return generate_totals(self.data)
+
+    def load_totals_index(self):
+        """
+        This method will build an index from every dimension and value in the totals to the positions of its rows.
+        The totals of the organisations are indexed by the values that identify them, like the other lookups.
+        :return: A dictionary with tuples of the dimension and the value as keys and arrays with the row positions as
+        values.
+        """
+        index = self.totals.groupby(['dimension', 'value'], sort=False).indices
+        return {(dimension, self.get_organisation_value(value) if dimension == 'organisation name' else value):
+                positions for (dimension, value), positions in index.items()}
+
+    def load_index(self, column):
+        """
+        This method will build an index from every distinct value in a column to the positions of its rows, so the
+        rows of a value can be looked up without scanning the whole column.
+        :param column: The column that needs to be indexed.
+        :return: A dictionary with the distinct values as keys and arrays with the row positions as values.
+        """
+        return self.data.groupby(column, observed=True, sort=False).indices
+
+    def load_info_totals(self, column):
+        """
+        This method will compute the numbers on the information cards for every distinct value in a column: the
+        amount of rows, the total amount of EP passes and the total amount of lobbyists. The organisations are
+        identified by their ID when the data has IDs.
+        :param column: The column of which the numbers are computed.
+        :return: A dictionary with the distinct values as keys and tuples with the numbers as values.
+        """
+        grouped = self.data.groupby(self.key_column(column), observed=True, sort=False)
+        totals = pd.DataFrame({'rows': grouped.size(), 'EP passes': grouped['EP passes'].sum(),
+                               'lobbyists (FTE)': grouped['lobbyists (FTE)'].sum()})
+        return dict(zip(totals.index, totals.itertuples(index=False, name=None)))
+
+    def get_indexed_data(self, column, values):
+        """
+        This method gets the rows that contain one of the values in an indexed column, in the order of the dataset.
+        :param column: The indexed column ('country head office', 'sub_cat' or 'organisation name', of which the
+        organisations are identified by their ID when the data has IDs).
+        :param values: The values that we want data about.
+        :return: The rows in the dataset that contain one of these values.
+        """
+        index = self.indexes[column]
+        positions = [index[value] for value in set(values) if value in index]
+        if positions:
+            positions = np.sort(np.concatenate(positions))
+        return self.data.iloc[positions]
+
+    def get_totals(self, column, value):
+        """
+        This method gets the totals per year of a single country, sub category or organisation.
+        :param column: The column of the value ('country head office', 'sub_cat' or 'organisation name').
+        :param value: The country, sub category or organisation (ID) that we want the totals of.
+        :return: The totals of the value, with one row per year in increasing order.
+        """
+        positions = self.totals_index.get((column, value), [])
+        return self.totals.iloc[positions]
+
+    def get_info_totals(self, column, value):
+        """
+        This method gets the numbers on the information cards of a single country, sub category or organisation.
+        :param column: The column of the value ('country head office', 'sub_cat' or 'organisation name').
+        :param value: The country, sub category or organisation (ID) that we want the numbers of.
+        :return: The amount of rows, the total amount of EP passes and the total amount of lobbyists.
+        """
+        return self.info_totals[column].get(value, (0, 0, 0))
+
+    def get_explore_bundle(self):
+        """
+        This method gets the totals per year and the numbers on the information cards of every country, sub category
+        and organisation in a compact columnar form, so the browser can create the explore plots and information cards
+        itself. The names are dictionary encoded: for every column there is a list of names and a list of the values
+        of the names in the dropdowns (the IDs of the organisations), and the rows of the name at position i are the
+        rows from offsets[i] to offsets[i + 1] of the other lists. The years are stored relative to the first year.
+        The sums are plain JSON numbers, because the totals of the countries do not fit in 32 bits.
+        :return: A dictionary with the first year and the totals of every column.
+        """
+        bundle = {'min_year': min_year, 'columns': {}}
+        for column in ['country head office', 'sub_cat', 'organisation name']:
+            totals = self.totals[self.totals['dimension'] == column]
+            codes, names = pd.factorize(totals['value'])
+            totals = totals.iloc[np.argsort(codes, kind='stable')]
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(names)))])
+            values = [self.get_organisation_value(name) if column == 'organisation name' else name for name in names]
+            info_totals = [self.get_info_totals(column, value) for value in values]
+            bundle['columns'][column] = {
+                'names': names.to_list(),
+                'values': values,
+                'offsets': offsets.tolist(),
+                'years': (totals['year'] - min_year).to_list(),
+                'begin_int': totals['begin_int'].to_list(),
+                'end_int': totals['end_int'].to_list(),
+                'rows': [rows for rows, _, _ in info_totals],
+                'ep_passes': [ep_passes for _, ep_passes, _ in info_totals],
+                'lobbyists': [lobbyists for _, _, lobbyists in info_totals]
+            }
+        return bundle
 
     def get_main_categories(self):
         """
@@ -79,12 +411,12 @@ class DataLoader:
     def get_organisations(self):
         """
         This method gets all the organisations in the dataset.
-        :return: A list of dictionaries with a key label and a key value that both have as value the name of an
-        origanisation.
+        :return: A list of dictionaries with a key label that has as value the name of an origanisation and a key value
+        that has as value its ID, or its name when the data has no IDs.
         """
         organisations = []
         for organisation in self.organisations_lst:
-            organisation_dict = dict(label=organisation, value=organisation)
+            organisation_dict = dict(label=organisation, value=self.get_organisation_value(organisation))
             organisations.append(organisation_dict)
         return organisations
 
@@ -106,7 +438,7 @@ class DataLoader:
         :return: The rows in the dataset that contain one of these countries.
         """
         if countries:
-            countries_data = self.data[self.data['country head office'].isin(countries)]
+            countries_data = self.get_indexed_data('country head office', countries)
             return countries_data
         else:
             return pd.DataFrame(columns=self.columns)
@@ -118,7 +450,7 @@ class DataLoader:
         :return: The rows in the dataset that contain one of these categories.
         """
         if categories:
-            categories_data = self.data[self.data['sub_cat'].isin(categories)]
+            categories_data = self.get_indexed_data('sub_cat', categories)
             return categories_data
         else:
             return pd.DataFrame(columns=self.columns)
@@ -126,25 +458,39 @@ class DataLoader:
     def get_organisations_data(self, organisations):
         """
         This method gets all available data about a list of organisations.
-        :param organisations: The organisations that we want data about.
+        :param organisations: The IDs of the organisations (or names, when the data has no IDs) that we want data about.
         :return: The rows in the dataset that contain one of these organisations.
         """
         if organisations:
-            organisations_data = self.data[self.data['organisation name'].isin(organisations)]
+            organisations_data = self.get_indexed_data('organisation name', organisations)
             return organisations_data
         else:
             return pd.DataFrame(columns=self.columns)
 
     def get_country_amount_of_organisations(self):
         """
-        This method gets all the country names and transforms them to their respective ISO 3 code, together with the
-        amount of organisations per country
+        This method gets all the country names together with their respective ISO 3 code, which was resolved during the
+        preprocessing, and the amount of organisations per country. The result is cached on disk for this version of
+        the dataset and of the ISO 3 codes, so it is only computed once. The cached results of other versions are
+        removed.
         """
-        countries_organisations_amount = []
+        iso3_version = content_hash(self.countries_file) if os.path.exists(self.countries_file) else 'none'
+        cache_name = 'countries_' + self.version + '_' + iso3_version
+        cache_file = os.path.join(self.cache_folder, cache_name + '.json')
+        try:
+            with open(cache_file) as file:
+                cached = json.load(file)
+            return cached['iso3_codes'], cached['amounts'], cached['countries']
+        except (FileNotFoundError, ValueError):
+            # The result was not cached yet, or the cache file was removed or could not be read.
+            pass
 
-        for country in self.countries_lst:
-            df_country = self.get_countries_data([country])
-            countries_organisations_amount.append(len(df_country))
+        country_index = self.indexes['country head office']
+        countries_organisations_amount = [len(country_index.get(country, [])) for country in self.countries_lst]
+        iso3_codes = [self.iso3_codes.get(country, 'not found') for country in self.countries_lst]
 
-        iso3_codes = coco.convert(names=self.countries_lst, to='ISO3')
+        os.makedirs(self.cache_folder, exist_ok=True)
+        atomic_write(cache_file, json.dumps({'iso3_codes': iso3_codes, 'amounts': countries_organisations_amount,
+                                             'countries': self.countries_lst}))
+        remove_outdated_files(self.cache_folder, 'countries_', cache_name)
         return iso3_codes, countries_organisations_amount, self.countries_lst
@@ -1,4 +1,3 @@
-import plotly.express as px
 import plotly.graph_objects as go
 from preprocessing import amount_years
 import numpy as np
@@ -19,7 +18,7 @@ def calc_totals(df):
         sum_middle_int (List[Int]): List of the averages of the intervals in the correct order.
         sum_end_int (List[Int]): List of the maximums of the intervals in the correct order.
     """
-    grouped_df = df.groupby(['year'])
+    grouped_df = df.groupby(['year'], observed=True)
 
     sum_begin_int = np.zeros(amount_years + 1)
     sum_middle_int = np.zeros(amount_years + 1)
@@ -136,3 +135,37 @@ def explore_organisation(organisation_data):
     fig = create_error_bar_plot(year_list, sum_begin_int, sum_middle_int, sum_end_int, marker_color, line_color)
 
     return fig
+
+
+def explore_totals(totals_data):
+    """
+    Method to a generate Plotly Error Bar plot which shows the total spending of a single country, organisation
+    category or organisation, with error bars for each year which represent the lobbying cost intervals.
+    The plot is generated from the precomputed totals per year, so no rows of the data need to be summed.
+    Args:
+        totals_data (dataframe): A pandas dataframe that contains the totals per year of the selected country,
+        organisation category or organisation.
+    Returns:
+        fig (Figure): Return the newly created explore plot.
+    """
+    sum_begin_int = totals_data['begin_int'].to_numpy()
+    sum_middle_int = totals_data['middle_int'].to_numpy()
+    sum_end_int = totals_data['end_int'].to_numpy()
+    year_list = [str(x) for x in totals_data['year']]
+
+    fig = create_error_bar_plot(year_list, sum_begin_int, sum_middle_int, sum_end_int, marker_color, line_color)
+
+    return fig
+
+
+def explore_template():
+    """
+    Method to generate an explore plot without any data, in which the browser fills in the totals of the selected
+    country, organisation category or organisation.
+    Returns:
+        fig (Figure): Return the explore plot without data.
+    """
+    empty = np.array([])
+    fig = create_error_bar_plot([], empty, empty, empty, marker_color, line_color)
+
+    return fig
@@ -0,0 +1,202 @@
+import collections
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+
+from plotly.utils import PlotlyJSONEncoder
+
+from preprocessing import atomic_write
+
+
+# The name of a shared figure file: the version of the dataset, the hash of the key and, while the file is written,
+# the process ID. Files without a version were written before the version was part of the name.
+shared_file_pattern = re.compile(r'^(?:(?P<version>.+)_)?[0-9a-f]{64}\.json(?:\.[0-9]+)?$')
+
+
+class FigureCache:
+    """
+    A bounded least recently used cache of serialized figures. The figures are kept as JSON in the memory of the
+    process and, when a folder is given, also in that folder, so the workers of the web server share their figures.
+    The folder keeps at most max_shared_size figures, the least recently used shared figures are removed first. The
+    shared figures of other versions of the dataset can be removed from the folder with remove_outdated.
+    When a listener is given, it is called with whether the figure was found for every lookup of a memoized function.
+    """
+
+    def __init__(self, max_size=256, folder=None, listener=None, max_shared_size=4096):
+        self.max_size = max_size
+        self.folder = folder
+        self.max_shared_size = max_shared_size
+        self.listener = listener
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.folder is not None:
+            os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def normalize(value):
+        """
+        This method will normalize a selection, so selections with the same values in another order share an entry.
+        :param value: The selection, which can be a single value, a list of values or None.
+        :return: The normalized selection.
+        """
+        if isinstance(value, (list, tuple)):
+            return sorted(value)
+        return value
+
+    def make_key(self, name, selection, version):
+        """
+        This method will create the key of a figure.
+        :param name: The name of the callback or function that creates the figure.
+        :param selection: The values in the dropdowns that were used to create the figure.
+        :param version: The version of the dataset from which the figure was created.
+        :return: The key as a string.
+        """
+        selection = [self.normalize(value) for value in selection]
+        return json.dumps([name, selection, version], sort_keys=True)
+
+    def shared_file(self, key, version):
+        """
+        This method gets the path of the file in which a figure is shared with the other workers. The name of the file
+        starts with the version of the dataset, so the figures of other versions can be recognised.
+        :param key: The key of the figure.
+        :param version: The version of the dataset from which the figure was created.
+        :return: The path of the file.
+        """
+        return os.path.join(self.folder, version + '_' + hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def remove_outdated(self, version):
+        """
+        This method removes the shared figures of other versions of the dataset from the folder, because they are
+        never requested again. Other files in the folder are left alone.
+        :param version: The current version of the dataset.
+        :return: The amount of removed files.
+        """
+        if self.folder is None:
+            return 0
+        removed = 0
+        for file_name in os.listdir(self.folder):
+            match = shared_file_pattern.match(file_name)
+            if match is None or match.group('version') == version:
+                continue
+            try:
+                os.remove(os.path.join(self.folder, file_name))
+                removed += 1
+            except FileNotFoundError:
+                # Another worker removed the file at the same time.
+                pass
+        return removed
+
+    def get(self, key, version):
+        """
+        This method gets a serialized figure from the cache.
+        :param key: The key of the figure.
+        :param version: The version of the dataset from which the figure was created.
+        :return: The figure as JSON, or None when it is not in the cache.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+        if self.folder is not None:
+            try:
+                with open(self.shared_file(key, version)) as file:
+                    serialized = file.read()
+                # The modification time marks the shared figure as recently used.
+                os.utime(self.shared_file(key, version))
+            except (FileNotFoundError, ValueError):
+                # The figure was not shared, another worker removed it or it could not be read, which is a miss.
+                serialized = None
+            if serialized is not None:
+                self.put(key, serialized, version, share=False)
+                with self.lock:
+                    self.shared_hits += 1
+                return serialized
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, serialized, version, share=True):
+        """
+        This method adds a serialized figure to the cache and evicts the least recently used figures when the cache
+        is full.
+        :param key: The key of the figure.
+        :param serialized: The figure as JSON.
+        :param version: The version of the dataset from which the figure was created.
+        :param share: Whether the figure is also written to the shared folder.
+        """
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = serialized
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+        if share and self.folder is not None:
+            atomic_write(self.shared_file(key, version), serialized)
+            self.evict_shared()
+
+    def evict_shared(self):
+        """
+        This method removes the least recently used shared figures when the folder has more figures than the maximum
+        amount, no matter their version. The figures that are being written are not counted.
+        """
+        figures = []
+        for file_name in os.listdir(self.folder):
+            if shared_file_pattern.match(file_name) is None or not file_name.endswith('.json'):
+                continue
+            try:
+                figures.append((os.path.getmtime(os.path.join(self.folder, file_name)), file_name))
+            except FileNotFoundError:
+                pass
+
+        for _, file_name in sorted(figures)[:max(len(figures) - self.max_shared_size, 0)]:
+            try:
+                os.remove(os.path.join(self.folder, file_name))
+            except FileNotFoundError:
+                # Another worker removed the figure at the same time.
+                pass
+
+    def memoize(self, name, version):
+        """
+        This method creates a decorator that caches the figures that a function returns by its arguments.
+        :param name: The name under which the figures of the function are cached.
+        :param version: A function that returns the version of the dataset from which the figures are created, which
+        is called for every lookup, so the version does not need to be known when the decorator is created.
+        :return: The decorator.
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*selection):
+                data_version = version()
+                key = self.make_key(name, selection, data_version)
+                serialized = self.get(key, data_version)
+                if self.listener is not None:
+                    self.listener(serialized is not None)
+                if serialized is not None:
+                    return json.loads(serialized)
+                figure = function(*selection)
+                self.put(key, json.dumps(figure, cls=PlotlyJSONEncoder), data_version)
+                return figure
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """
+        This method gets the counters of the cache.
+        :return: A dictionary with the amount of entries, hits, shared hits, misses and evictions.
+        """
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'shared_hits': self.shared_hits,
+                    'misses': self.misses, 'evictions': self.evictions}
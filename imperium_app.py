@@ -1,196 +1,297 @@
+import functools
+import os
+import threading
+
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 
 import md_templates
+import settings
 import world_plots
 import explorer_plots
 import comparer_plots
+from callback_metrics import CallbackMetrics
 from data_loader import DataLoader
+from figure_cache import FigureCache
+from precompressed_dash import PrecompressedDash
 
 # Bulma stylesheet
 external_stylesheets = [
     'https://cdn.jsdelivr.net/npm/bulma@0.9.2/css/bulma.min.css']
 
-app = dash.Dash(__name__, title="Imperium: Looking at the EU",
-                external_stylesheets=external_stylesheets, suppress_callback_exceptions=True)
+# The preprocessed data.
+data_file = 'data/data_cat.csv'
 
-# Initialise the data loader.
-data = DataLoader()
+# The compressed layouts are kept next to the other cached files of the data.
+app = PrecompressedDash(__name__, title="Imperium: Looking at the EU",
+                        external_stylesheets=external_stylesheets, suppress_callback_exceptions=True,
+                        snapshot_folder=os.path.join(os.path.dirname(data_file), 'cache'))
 
-# Load static data
-countries = data.get_countries()
-categories = data.get_main_categories()
-sub_categories = data.get_sub_categories()
-organisations = data.get_organisations()
+# The data loader, which is created by get_data when the data is first needed.
+data = None
+data_lock = threading.Lock()
 
-# Load necessary data and plot for world map
-iso3_codes, countries_business_amount, countries_list = data.get_country_amount_of_organisations()
-world_map = world_plots.map_plot(
-    iso3_codes, countries_business_amount, countries_list)
 
+# Get the data loader, the data is loaded on the first call. The shared figures of other versions of the data are
+# removed from the figure cache once the version of the loaded data is known.
+def get_data():
+    global data
+    with data_lock:
+        if data is None:
+            data = DataLoader(data_file, mmap=settings.use_mmap, compact=settings.compact_data)
+            figure_cache.remove_outdated(data.version)
+    return data
 
 
+# The version of the loaded data, which is only known after the data is loaded.
+def get_data_version():
+    return get_data().version
+
+
+# Options of the organisation dropdowns. In the dynamic options mode, the organisation dropdowns start empty and get
+# their options from a search callback.
+@functools.lru_cache(maxsize=None)
+def get_organisation_options():
+    if settings.dynamic_organisation_options:
+        return []
+    return get_data().get_organisations()
+
+
+# Plot for world map. The world map is built and converted to a dictionary only once, the callbacks derive the zoomed
+# world maps from it by patching its layout.
+@functools.lru_cache(maxsize=None)
+def get_world_map():
+    iso3_codes, countries_business_amount, countries_list = get_data().get_country_amount_of_organisations()
+    return world_plots.map_plot(
+        iso3_codes, countries_business_amount, countries_list).to_dict()
+
+
+# Totals of every country, sub category and organisation and the explore plot without data, from which the browser
+# creates the explore plots and information cards in the clientside explore mode.
+@functools.lru_cache(maxsize=None)
+def get_explore_bundle():
+    bundle = get_data().get_explore_bundle()
+    bundle['figure'] = explorer_plots.explore_template().to_dict()
+    return bundle
+
+
+# Opt-in measurements of the phases, the response sizes and the figure cache hits of the callbacks.
+metrics = CallbackMetrics(settings.callback_metrics, settings.metrics_log_interval)
+
+# Cache of the explore and compare figures, keyed by the selection and the version of the dataset.
+figure_cache = FigureCache(settings.figure_cache_size, settings.figure_cache_folder, metrics.record_cache_lookup,
+                           settings.figure_cache_shared_size)
+
+
+# Explore plot of a single country, sub category or organisation.
+@figure_cache.memoize('explore', get_data_version)
+def explore_figure(column, value):
+    with metrics.phase('filter'):
+        totals = get_data().get_totals(column, value)
+    with metrics.phase('figure'):
+        return explorer_plots.explore_totals(totals)
 
-################# Start Callback handlers #################
 
-# Update information cards with numbers of selected country/category/organisation
-@app.callback(Output('info-card', 'children'),
-              Output('info-card-2', 'children'),
-              Output('selected-country', 'children'),
-              [Input('countries-dropdown', 'value'),
-               Input('organisations-dropdown', 'value'),
-               Input('sub-categories-dropdown', 'value')])
-def update_companies_here(country, organisation, sub_category):
+# Compare plot of the selected countries, sub categories or organisations.
+@figure_cache.memoize('compare', get_data_version)
+def compare_figure(view, selection):
+    with metrics.phase('filter'):
+        if view == 'Country':
+            df = get_data().get_countries_data(selection)
+        elif view == 'Organisation':
+            df = get_data().get_organisations_data(selection)
+        else:
+            df = get_data().get_sub_categories_data(selection)
+    with metrics.phase('aggregation'):
+        result_df = comparer_plots.compare_totals(df, view)
+    with metrics.phase('figure'):
+        return comparer_plots.compare_plot(result_df, view)
+
+
+# The column in the data that belongs to every explore dropdown.
+dropdown_columns = {
+    'countries-dropdown': 'country head office',
+    'organisations-dropdown': 'organisation name',
+    'sub-categories-dropdown': 'sub_cat'
+}
+
+
+# Information cards with numbers of selected country/category/organisation, the numbers are looked up in the
+# totals that the data loader computed when the data was loaded. Organisations are selected by their ID, so their
+# name is looked up for the cards.
+def info_cards(country, organisation, sub_category):
     info_card = "**" + "No criteria selected" + "**"
     info_card_2 = "**" + "No criteria selected" + "**"
     selected_country = "**" + "No criteria selected" + "**"
     if country is not None:
-        country_data = data.get_countries_data([country])
-        company_amount = str(len(country_data))
-        ep_amount = str(country_data['EP passes'].sum())
+        company_amount, ep_amount, _ = get_data().get_info_totals('country head office', country)
         info_card = "**" + country + "**" + " has " + \
-            company_amount + " organisations in our database"
-        info_card_2 = "**" + country + "**" + " has " + ep_amount + " EP Passes"
+            str(company_amount) + " organisations in our database"
+        info_card_2 = "**" + country + "**" + " has " + str(ep_amount) + " EP Passes"
         selected_country = country
     elif organisation is not None:
-        selected_country = organisation
-        business_data = data.get_organisations_data([organisation])
-        ep_passes = 0
-        lobbyist = 0
-        for row in business_data.itertuples(index=False):
-            ep_passes += row[business_data.columns.get_loc('EP passes')]
-            lobbyist += row[business_data.columns.get_loc('lobbyists (FTE)')]
-        info_card = "**" + organisation + "**" + \
+        organisation_name = get_data().get_organisation_name(organisation)
+        selected_country = organisation_name
+        _, ep_passes, lobbyist = get_data().get_info_totals('organisation name', organisation)
+        info_card = "**" + organisation_name + "**" + \
             " has " + str(lobbyist) + " lobbyists"
-        info_card_2 = "**" + organisation + "**" + \
+        info_card_2 = "**" + organisation_name + "**" + \
             " has " + str(ep_passes) + " EP Passes"
     elif sub_category is not None:
         selected_country = sub_category
-        business_data = data.get_sub_categories_data([sub_category])
-        nr_organisations = str(len(business_data))
-        ep_passes = str(business_data['EP passes'].sum())
-        info_card = "There are " + nr_organisations + \
+        nr_organisations, ep_passes, _ = get_data().get_info_totals('sub_cat', sub_category)
+        info_card = "There are " + str(nr_organisations) + \
             " **" + sub_category + "**" + " in our database"
-        info_card_2 = "**" + sub_category + "**" + " has " + ep_passes + " EP Passes"
+        info_card_2 = "**" + sub_category + "**" + " has " + str(ep_passes) + " EP Passes"
 
     return info_card, info_card_2, selected_country
 
 
-# Update the explore plots.
-@app.callback(Output('explore-plot', 'figure'),
-              [Input('countries-dropdown', 'value'),
-               Input('organisations-dropdown', 'value'),
-               Input('sub-categories-dropdown', 'value')])
-def update_explore_plot(country, organisation, sub_category):
-    ctx = dash.callback_context
-
-    if ctx.triggered:
-        dropdown = ctx.triggered[0]['prop_id'].split('.')[0]
-        if dropdown == 'countries-dropdown':
-            country_data = data.get_countries_data([country])
-            country_plot = explorer_plots.explore_country(country_data)
-            return country_plot
-        elif dropdown == 'organisations-dropdown':
-            organisation_data = data.get_organisations_data([organisation])
-            organisation_plot = explorer_plots.explore_organisation(
-                organisation_data)
-            return organisation_plot
-        else:
-            category_data = data.get_sub_categories_data([sub_category])
-            category_plot = explorer_plots.explore_category(category_data)
-            return category_plot
-    else:
-        # This data will the always be empty
-        category_data = data.get_countries_data([])
-        category_plot = explorer_plots.explore_category(category_data)
-        return category_plot
-
-
-# Callback to clear the other dropdowns when clicking on something.
-@app.callback(Output('countries-dropdown', 'value'),
-              Output('organisations-dropdown', 'value'),
-              Output('sub-categories-dropdown', 'value'),
-              Output('world-map', 'figure'),
-              Output('world-map', 'clickData'),
-              [Input('countries-dropdown', 'value'),
-               Input('organisations-dropdown', 'value'),
-               Input('sub-categories-dropdown', 'value'),
-               Input('world-map', 'clickData')])
-def dropdown_map_interaction(country, organisation, sub_category, click_data):
-    world_map = world_plots.map_plot(
-        iso3_codes, countries_business_amount, countries_list)
-
-    if click_data is not None:
-        country = click_data['points'][0]['hovertext']
-        zoomed_world_map = world_plots.zoom_world_map(world_map, country)
-        return country, None, None, zoomed_world_map, None
+################# Start Callback handlers #################
+
+# Update the information cards and the explore plot in a single request when one of the explore dropdowns changes.
+# The information cards follow the selection with the highest priority, the explore plot follows the dropdown that
+# was changed. Dash merges the triggers that are pending at the same time, so the dropdowns that were just cleared
+# can be triggered as well; the explore plot follows the changed dropdown that has a value.
+def update_explore_selection(country, organisation, sub_category):
+    with metrics.phase('filter'):
+        info_card, info_card_2, selected_country = info_cards(country, organisation, sub_category)
+
+    values = {'countries-dropdown': country, 'organisations-dropdown': organisation,
+              'sub-categories-dropdown': sub_category}
+    triggered = [trigger['prop_id'].split('.')[0] for trigger in dash.callback_context.triggered or []]
+    dropdown = next((dropdown for dropdown in triggered
+                     if dropdown in dropdown_columns and values[dropdown] is not None), None)
+    if dropdown is not None:
+        explore_plot = explore_figure(dropdown_columns[dropdown], values[dropdown])
     else:
-        ctx = dash.callback_context
-
-        if ctx.triggered:
-            dropdown = ctx.triggered[0]['prop_id'].split('.')[0]
-            if dropdown == 'countries-dropdown':
-                if country is None:
-                    return country, None, None, world_map, None
-                else:
-                    zoomed_world_map = world_plots.zoom_world_map(
-                        world_map, country)
-                    return country, None, None, zoomed_world_map, None
-            elif dropdown == 'organisations-dropdown':
-                return None, organisation, None, world_map, None
-            else:
-                return None, None, sub_category, world_map, None
-        else:
-            return country, None, None, world_map, None
+        # Nothing was triggered or the changed dropdowns were cleared, so this data will always be empty
+        category_data = get_data().get_countries_data([])
+        explore_plot = explorer_plots.explore_category(category_data)
+
+    return info_card, info_card_2, selected_country, explore_plot
+
+
+# Send the totals to the browser once, when the page is loaded. The modification time of the store tells whether the
+# totals were already sent, without sending them back to the server.
+def load_explore_bundle(pathname, modified_timestamp):
+    if modified_timestamp is not None and modified_timestamp >= 0:
+        raise PreventUpdate
+    return get_explore_bundle()
+
+
+# Callbacks for the information cards and the explore plot, which either run in the browser (assets/clientside.js)
+# from the totals in the explore bundle store or request every selection from the server.
+if settings.clientside_explore:
+    app.callback(Output('explore-bundle', 'data'),
+                 [Input('url', 'pathname')],
+                 [State('explore-bundle', 'modified_timestamp')])(load_explore_bundle)
+    app.clientside_callback(ClientsideFunction(namespace='imperium', function_name='render_explore'),
+                            Output('info-card', 'children'),
+                            Output('info-card-2', 'children'),
+                            Output('selected-country', 'children'),
+                            Output('explore-plot', 'figure'),
+                            [Input('countries-dropdown', 'value'),
+                             Input('organisations-dropdown', 'value'),
+                             Input('sub-categories-dropdown', 'value'),
+                             Input('explore-bundle', 'data')])
+else:
+    app.callback(Output('info-card', 'children'),
+                 Output('info-card-2', 'children'),
+                 Output('selected-country', 'children'),
+                 Output('explore-plot', 'figure'),
+                 [Input('countries-dropdown', 'value'),
+                  Input('organisations-dropdown', 'value'),
+                  Input('sub-categories-dropdown', 'value')])(update_explore_selection)
+
+
+# Callback to select the clicked country of the world map and to clear the other dropdowns when clicking on
+# something. It runs in the browser (assets/clientside.js), because it does not need any data.
+app.clientside_callback(ClientsideFunction(namespace='imperium', function_name='select_dropdown'),
+                        Output('countries-dropdown', 'value'),
+                        Output('organisations-dropdown', 'value'),
+                        Output('sub-categories-dropdown', 'value'),
+                        Output('world-map', 'clickData'),
+                        [Input('countries-dropdown', 'value'),
+                         Input('organisations-dropdown', 'value'),
+                         Input('sub-categories-dropdown', 'value'),
+                         Input('world-map', 'clickData')])
+
+
+# Callback to switch the tab in the compare dropdown, which also runs in the browser.
+app.clientside_callback(ClientsideFunction(namespace='imperium', function_name='select_tab'),
+                        Output('compare-tabs', 'value'),
+                        [Input('countries-dropdown', 'value'),
+                         Input('organisations-dropdown', 'value'),
+                         Input('sub-categories-dropdown', 'value')])
+
+
+# Zoom the world map to the selected country, or show the whole world when no country is selected.
+@app.callback(Output('world-map', 'figure'),
+              [Input('countries-dropdown', 'value')])
+def update_world_map(country):
+    world_map = get_world_map()
+    if country is None:
+        return world_map
+    with metrics.phase('figure'):
+        return world_plots.zoom_world_map(world_map, country)
 
 
 # Callback for compare country plot
 @app.callback(Output('compare-countries-plot', 'figure'),
               [Input('compare-countries-dropdown', 'value')])
 def update_compare_countries_plot(selected_countries):
-    df = data.get_countries_data(selected_countries)
-    fig = comparer_plots.compare_data(df, 'Country')
-    return fig
+    return compare_figure('Country', selected_countries)
 
 
 # Callback for compare category plot
 @app.callback(Output('compare-categories-plot', 'figure'),
               [Input('compare-categories-dropdown', 'value')])
 def update_compare_categories_plot(selected_categories):
-    df = data.get_sub_categories_data(selected_categories)
-    fig = comparer_plots.compare_data(df, 'Category')
-    return fig
+    return compare_figure('Category', selected_categories)
 
 
 # Callback for compare organisation plot
 @app.callback(Output('compare-organisations-plot', 'figure'),
               [Input('compare-organisations-dropdown', 'value')])
 def update_compare_organisations_plot(selected_organisations):
-    df = data.get_organisations_data(selected_organisations)
-    fig = comparer_plots.compare_data(df, 'Organisation')
-    return fig
-
-
-# Callback to switch the tab in the compare dropdown
-@app.callback(Output('compare-tabs', 'value'),
-              [Input('countries-dropdown', 'value'),
-               Input('organisations-dropdown', 'value'),
-               Input('sub-categories-dropdown', 'value')])
-def update_compare_dropdown(country, organisation, sub_category):
-    ctx = dash.callback_context
-
-    if ctx.triggered:
-        dropdown = ctx.triggered[0]['prop_id'].split('.')[0]
-        if dropdown == 'countries-dropdown':
-            return 'tab-country'
-        elif dropdown == 'organisations-dropdown':
-            return 'tab-organisation'
-        else:
-            return 'tab-category'
-    else:
-        return 'tab-country'
+    return compare_figure('Organisation', selected_organisations)
+
+
+# Search the organisations that match the text typed in an organisation dropdown. The selected organisations stay
+# in the options, otherwise the dropdown can no longer show them. The options have the IDs of the organisations as
+# values and their names as labels.
+def search_organisation_options(search_value, selected):
+    if not search_value:
+        raise PreventUpdate
+    if selected is None:
+        selected = []
+    elif not isinstance(selected, list):
+        selected = [selected]
+    matches = get_data().search_organisations(search_value, settings.organisation_search_limit)
+    matches = [get_data().get_organisation_value(organisation) for organisation in matches]
+    matches = selected + [organisation for organisation in matches if organisation not in selected]
+    return [dict(label=get_data().get_organisation_name(organisation), value=organisation) for organisation in matches]
+
+
+# Callbacks for the organisation dropdowns, which either search the organisations in the dynamic options mode or
+# copy all organisations to the compare dropdown in the browser (assets/clientside.js) when its tab is opened.
+if settings.dynamic_organisation_options:
+    app.callback(Output('organisations-dropdown', 'options'),
+                 [Input('organisations-dropdown', 'search_value')],
+                 [State('organisations-dropdown', 'value')])(search_organisation_options)
+    app.callback(Output('compare-organisations-dropdown', 'options'),
+                 [Input('compare-organisations-dropdown', 'search_value')],
+                 [State('compare-organisations-dropdown', 'value')])(search_organisation_options)
+else:
+    app.clientside_callback(ClientsideFunction(namespace='imperium', function_name='copy_organisation_options'),
+                            Output('compare-organisations-dropdown', 'options'),
+                            [Input('compare-tabs', 'value')],
+                            [State('organisations-dropdown', 'options'),
+                             State('compare-organisations-dropdown', 'options')])
 
 ################# End Callback handlers #################
 
@@ -215,91 +316,96 @@ nav = html.Nav([
     ], className="navbar-menu")
 ], className="navbar is-light has-shadow")
 
-# Main dashboard HTML
-body = html.Div([
-    html.Br(),
-    html.Br(),
-    html.Div([
+# Main dashboard HTML, which needs the data for the options of the dropdowns and the world map.
+def create_body():
+    countries = get_data().get_countries()
+    sub_categories = get_data().get_sub_categories()
+    organisations = get_organisation_options()
+    world_map = get_world_map()
+    return html.Div([
+        html.Br(),
+        html.Br(),
         html.Div([
             html.Div([
-                dcc.Markdown(children='Filter by Country',
-                             className='title is-6 center'),
-                dcc.Dropdown(id='countries-dropdown',
-                             options=countries, style={'margin-left': '5px'}),
-            ], className='column is-one-third'),
-            html.Div([
-                dcc.Markdown(children='Filter by Category',
-                             className='title is-6 center'),
-                dcc.Dropdown(id='sub-categories-dropdown',
-                             options=sub_categories)
-            ], className='column'),
-            html.Div([
-                dcc.Markdown(children='Filter by Organisation',
-                             className='title is-6 center'),
-                dcc.Dropdown(id='organisations-dropdown', options=organisations, optionHeight=60,
-                             style={'margin-right': '5px'}),
-            ], className='column')
-        ], className='columns is-centered')
-    ], className='card'),
-    html.Br(),
-    html.Div([
-        html.Div([
-            html.Div([
-                dcc.Graph(id='world-map', figure=world_map)
-            ], className='card'),
-        ], className='column is-two-thirds'),
+                html.Div([
+                    dcc.Markdown(children='Filter by Country',
+                                 className='title is-6 center'),
+                    dcc.Dropdown(id='countries-dropdown',
+                                 options=countries, style={'margin-left': '5px'}),
+                ], className='column is-one-third'),
+                html.Div([
+                    dcc.Markdown(children='Filter by Category',
+                                 className='title is-6 center'),
+                    dcc.Dropdown(id='sub-categories-dropdown',
+                                 options=sub_categories)
+                ], className='column'),
+                html.Div([
+                    dcc.Markdown(children='Filter by Organisation',
+                                 className='title is-6 center'),
+                    dcc.Dropdown(id='organisations-dropdown', options=organisations, optionHeight=60,
+                                 style={'margin-right': '5px'}),
+                ], className='column')
+            ], className='columns is-centered')
+        ], className='card'),
+        html.Br(),
         html.Div([
             html.Div([
                 html.Div([
-                    html.Br(),
-                    html.Br(),
-                    dcc.Markdown(className='subtitle is-3 center',
-                                 id='info-card'),
-                ], className='content is-centered')
-            ], className='card meta-info'),
-            html.Br(),
-            html.Br(),
+                    dcc.Graph(id='world-map', figure=world_map)
+                ], className='card'),
+            ], className='column is-two-thirds'),
             html.Div([
                 html.Div([
-                    html.Br(),
-                    html.Br(),
-                    dcc.Markdown(className='subtitle is-3 center',
-                                 id='info-card-2'),
-                ], className='content is-centered')
-            ], className='card meta-info'),
-        ], className='column'),
-    ], className='columns is-centered'),
-    html.Div([
+                    html.Div([
+                        html.Br(),
+                        html.Br(),
+                        dcc.Markdown(className='subtitle is-3 center',
+                                     id='info-card'),
+                    ], className='content is-centered')
+                ], className='card meta-info'),
+                html.Br(),
+                html.Br(),
+                html.Div([
+                    html.Div([
+                        html.Br(),
+                        html.Br(),
+                        dcc.Markdown(className='subtitle is-3 center',
+                                     id='info-card-2'),
+                    ], className='content is-centered')
+                ], className='card meta-info'),
+            ], className='column'),
+        ], className='columns is-centered'),
         html.Div([
             html.Div([
-                dcc.Markdown(children='You are looking at ', className='subtitle is-4 center',
-                             style={'border-radius': '60px'}),
-                dcc.Markdown(className='title is-4 center',
-                             id='selected-country'),
-                dcc.Graph(id='explore-plot')
-            ], className='column is-half'),
-            html.Div([
-                dcc.Tabs(id='compare-tabs', value='tab-country', children=[
-                    dcc.Tab(label='Compare countries', value='tab-country', children=[
-                        dcc.Dropdown(id='compare-countries-dropdown', options=countries, multi=True,
-                                     style={'margin-right': '5px'}),
-                        dcc.Graph(id='compare-countries-plot')
-                    ]),
-                    dcc.Tab(label='Compare categories', value='tab-category',  children=[
-                        dcc.Dropdown(id='compare-categories-dropdown', options=sub_categories, multi=True,
-                                     style={'margin-right': '5px'}),
-                        dcc.Graph(id='compare-categories-plot')
+                html.Div([
+                    dcc.Markdown(children='You are looking at ', className='subtitle is-4 center',
+                                 style={'border-radius': '60px'}),
+                    dcc.Markdown(className='title is-4 center',
+                                 id='selected-country'),
+                    dcc.Graph(id='explore-plot')
+                ], className='column is-half'),
+                html.Div([
+                    dcc.Tabs(id='compare-tabs', value='tab-country', children=[
+                        dcc.Tab(label='Compare countries', value='tab-country', children=[
+                            dcc.Dropdown(id='compare-countries-dropdown', options=countries, multi=True,
+                                         style={'margin-right': '5px'}),
+                            dcc.Graph(id='compare-countries-plot')
+                        ]),
+                        dcc.Tab(label='Compare categories', value='tab-category',  children=[
+                            dcc.Dropdown(id='compare-categories-dropdown', options=sub_categories, multi=True,
+                                         style={'margin-right': '5px'}),
+                            dcc.Graph(id='compare-categories-plot')
+                        ]),
+                        dcc.Tab(label='Compare organisations', value='tab-organisation', children=[
+                            dcc.Dropdown(id='compare-organisations-dropdown', options=[], multi=True,
+                                         style={'margin-right': '5px'}, optionHeight=60),
+                            dcc.Graph(id='compare-organisations-plot')
+                        ])
                     ]),
-                    dcc.Tab(label='Compare organisations', value='tab-organisation', children=[
-                        dcc.Dropdown(id='compare-organisations-dropdown', options=organisations, multi=True,
-                                     style={'margin-right': '5px'}, optionHeight=60),
-                        dcc.Graph(id='compare-organisations-plot')
-                    ])
-                ]),
-            ], className='column')
-        ], className='columns'),
-    ], className='card')
-], className='container is-fluid', id="home")
+                ], className='column')
+            ], className='columns'),
+        ], className='card')
+    ], className='container is-fluid', id="home")
 
 
 # About page HTML 
@@ -314,28 +420,24 @@ about = html.Div([html.Div([
 
 ################# End Main HTML Code ##################
 
-# Load about page
-def aboutpage():
-    layout = html.Div([
-        nav,
-        about
-    ], style={'backgroundColor': '$light'})
-    return layout
-
-#Load homepage
-def homepage():
-    layout = html.Div([
+# Url handler, both pages are part of the static layout and the url only determines which one is visible. In the
+# clientside explore mode, the layout also has the store in which the totals are sent to the browser.
+def create_layout():
+    stores = [dcc.Store(id='explore-bundle')] if settings.clientside_explore else []
+    return html.Div([
+        dcc.Location(id='url', refresh=False),
+        *stores,
         nav,
-        body
+        html.Div(create_body(), id='home-page'),
+        html.Div(about, id='about-page', style={'display': 'none'})
     ], style={'backgroundColor': '$light'})
-    return layout
 
 
-# Url handler
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    html.Div(id='page-content')
-])
+# In the lazy startup mode, the data is loaded and the layout is created when the layout is first requested.
+if settings.lazy_startup:
+    app.layout = create_layout
+else:
+    app.layout = create_layout()
 
 # App Header settings, loads favicon image
 app.head = [
@@ -345,16 +447,19 @@ app.head = [
     ),
 ]
 
-# Responsible for handling URL and loading correct page depending on which url is accesed.
-@app.callback(dash.dependencies.Output('page-content', 'children'),
+# Responsible for handling URL and showing the correct page depending on which url is accesed.
+@app.callback(dash.dependencies.Output('home-page', 'style'),
+              dash.dependencies.Output('about-page', 'style'),
               [dash.dependencies.Input('url', 'pathname')])
 def display_page(pathname):
-    if pathname == '/home':
-        return homepage()
-    elif pathname == '/about':
-        return aboutpage()
+    if pathname == '/about':
+        return {'display': 'none'}, {}
     else:
-        return homepage()
+        return {}, {'display': 'none'}
+
+
+# Measure the callbacks when the callback metrics are enabled, after all callbacks are registered.
+metrics.init_app(app)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import json
+import os
+
+import dash
+import dash_html_components as html
+import flask
+import plotly
+from dash import _validate
+
+from preprocessing import atomic_write, remove_outdated_files
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compression levels of the layout. The highest levels compress the layout only slightly better, but take seconds
+# instead of a tenth of a second, which the first request for the layout of every worker would wait for.
+gzip_level = 6
+brotli_quality = 7
+
+
+class PrecompressedDash(dash.Dash):
+    """
+    A Dash app of which the layout is static: it is serialized and compressed (gzip and, when available, Brotli) only
+    once, after which every request for the layout gets the precompressed response that the browser accepts. The
+    layout can also be a function, which is then only called when the layout is first needed.
+    When a snapshot folder is given, the compressed layouts are kept in that folder by the hash of the serialized
+    layout, so a restarted app with the same layout does not need to compress it again. The compressed layouts of
+    other hashes are removed from that folder.
+    """
+
+    def __init__(self, *args, snapshot_folder=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.snapshot_folder = snapshot_folder
+        self.layout_digest = None
+        self.layout_payloads = None
+        self.static_layout = None
+        self.setting_up = False
+
+    def _setup_server(self):
+        """
+        This method sets up the server before the first request. Dash validates the layout here, which would create
+        the layout when it is a function, so such a layout is validated when it is first needed instead.
+        """
+        self.setting_up = True
+        try:
+            super()._setup_server()
+        finally:
+            self.setting_up = False
+
+    def _layout_value(self):
+        """
+        This method gets the layout, which is created only once when the layout is a function.
+        :return: The layout.
+        """
+        if self.static_layout is None:
+            if self.setting_up and self._layout_is_function:
+                return html.Div()
+            self.static_layout = super()._layout_value()
+            if self._layout_is_function:
+                _validate.validate_layout(self.layout, self.static_layout)
+        return self.static_layout
+
+    def snapshot_file(self, encoding):
+        """
+        This method gets the path of the file in which the compressed layout is kept.
+        :param encoding: The encoding of the compressed layout.
+        :return: The path of the file.
+        """
+        return os.path.join(self.snapshot_folder, 'layout_' + self.layout_digest + '.' + encoding)
+
+    def compress_payload(self, payload, encoding):
+        """
+        This method will compress the serialized layout, or read it from the snapshot folder when it was compressed
+        before.
+        :param payload: The serialized layout.
+        :param encoding: The encoding ('gzip' or 'br').
+        :return: The compressed layout.
+        """
+        if self.snapshot_folder is not None:
+            try:
+                with open(self.snapshot_file(encoding), 'rb') as file:
+                    return file.read()
+            except FileNotFoundError:
+                # The layout was not compressed before, or another worker removed it.
+                pass
+
+        if encoding == 'gzip':
+            compressed = gzip.compress(payload, compresslevel=gzip_level)
+        else:
+            compressed = brotli.compress(payload, quality=brotli_quality)
+
+        if self.snapshot_folder is not None:
+            os.makedirs(self.snapshot_folder, exist_ok=True)
+            atomic_write(self.snapshot_file(encoding), compressed, 'wb')
+            remove_outdated_files(self.snapshot_folder, 'layout_', 'layout_' + self.layout_digest + '.')
+        return compressed
+
+    def compress_layout(self):
+        """
+        This method will serialize the layout and compress it with every available encoding.
+        :return: A dictionary with the encodings as keys and the (compressed) serialized layouts as values.
+        """
+        payload = json.dumps(self._layout_value(), cls=plotly.utils.PlotlyJSONEncoder).encode('utf-8')
+        self.layout_digest = hashlib.sha256(payload).hexdigest()
+        payloads = {'identity': payload, 'gzip': self.compress_payload(payload, 'gzip')}
+        if brotli is not None:
+            payloads['br'] = self.compress_payload(payload, 'br')
+        return payloads
+
+    def serve_layout(self):
+        """
+        This method serves the layout with the best encoding that the browser accepts. A browser that already has the
+        layout gets an empty response with status 304 (Not Modified).
+        :return: The response with the serialized layout.
+        """
+        if self.layout_payloads is None:
+            self.layout_payloads = self.compress_layout()
+
+        accepted_encodings = flask.request.headers.get('Accept-Encoding', '')
+        encoding = 'identity'
+        for preferred_encoding in ['br', 'gzip']:
+            if preferred_encoding in self.layout_payloads and preferred_encoding in accepted_encodings:
+                encoding = preferred_encoding
+                break
+
+        response = flask.Response(self.layout_payloads[encoding], mimetype='application/json')
+        response.headers['Vary'] = 'Accept-Encoding'
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(self.layout_digest + '-' + encoding)
+        return response.make_conditional(flask.request)
@@ -1,3 +1,14 @@
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
 import pandas as pd
 
 # The minimum year of available data
@@ -50,6 +61,62 @@ columns = {
 all_file_name = './data/' + 'data_all.csv'
 # File with all the data (with categories)
 cat_file_name = './data/' + 'data_cat.csv'
+# Parquet file with all the data (no categories)
+all_parquet_file_name = './data/' + 'data_all.parquet'
+# Parquet file with all the data (with categories)
+cat_parquet_file_name = './data/' + 'data_cat.parquet'
+
+# Folder with one NumPy file per column of all the data (with categories), which can be memory-mapped
+cat_mmap_folder_name = './data/' + 'data_cat_mmap/'
+# File in the memory-mapped folder that describes the columns and contains the categories of the string columns
+mmap_columns_file_name = 'columns.json'
+
+# File with the integer ID of every organisation that was ever preprocessed, so the IDs stay the same across runs
+organisations_file_name = './data/' + 'organisations.csv'
+# Name of the new column with the ID of the organisation, which is also used in the file with the organisations
+organisation_id_column_name = 'organisation_id'
+
+# File with the ISO 3 code of every country in the data, which is used by the world map
+countries_file_name = './data/' + 'countries.csv'
+# Names of the columns in the file with the countries
+country_column_name = 'country'
+iso3_column_name = 'iso3'
+
+# Bundled file with the centroid and a suggested zoom level of every country, which is used to zoom the world map
+centroids_file_name = './data/' + 'country_centroids.csv'
+# Names of the columns in the file with the centroids (the country column is shared with the file with the countries)
+latitude_column_name = 'latitude'
+longitude_column_name = 'longitude'
+projection_scale_column_name = 'projection_scale'
+
+# Files with the totals per year of every country, sub category and organisation, which are used by the explore plots
+totals_file_name = './data/' + 'data_totals.csv'
+totals_parquet_file_name = './data/' + 'data_totals.parquet'
+# Names of the columns in the files with the totals, next to the year and the summed columns
+dimension_column_name = 'dimension'
+value_column_name = 'value'
+middle_interval_name = 'middle_int'
+# The columns of the data by which the totals are computed
+totals_dimensions = [country_head_office_str, sub_cat_column_name, organisation_name_str]
+
+# Columns with few distinct values, which are stored as categoricals in the Parquet files
+categorical_columns = [country_head_office_str, main_cat_column_name, sub_cat_column_name, year_column_name]
+
+# Paths of the files that are used to only preprocess the years of which the downloaded data changed
+# Folder with the preprocessed data of every year
+cache_folder = './data/cache/'
+# File with the size, modification time and hash of every downloaded file that was preprocessed
+manifest_file_name = cache_folder + 'manifest.json'
+# Version of the cached data, which needs to be increased whenever the preprocessing of a single year changes
+cache_version = 1
+
+# Settings of the streaming mode, which reads the downloaded files in chunks and sorts the data on disk
+# The amount of rows that is read from a downloaded file at once
+stream_chunk_rows = 10000
+# The default memory budget in megabytes, of which the sorted runs that are spilled to disk take at most half
+default_memory_budget = 256
+# Folder in which the sorted runs are spilled before they are merged
+runs_folder = cache_folder + 'runs/'
 
 # The folder in the data directory are numbered, each number represents a category which is given here.
 main_categories = {
@@ -90,9 +157,28 @@ sub_categories = {
     }
 }
 
+# Some country names are written wrong in the downloaded data, so they are renamed in the list of countries
+country_name_corrections = {
+    'Afganistan': 'Afghanistan',
+    'Gibralter': 'Gibraltar'
+}
+
+# Countries that no longer exist, which are left out of the list of countries
+excluded_countries = ['Netherlands Antilles']
+
 # The number of available main categories in the data
 num_categories = len(main_categories.keys())
 
+# Regular expression that matches the 5 possible lobbying costs formats (after removing commas and whitespace).
+# Every format has its own named groups, so a single extract over a column parses all of them at once. Only ASCII
+# digits are matched, because pd.to_numeric does not convert other digits. A range with more than two numbers uses
+# the first two, like generate_interval.
+interval_pattern = (r'^(?:<(?P<below>[0-9]+)'
+                    r'|>(?P<above>[0-9]+)'
+                    r'|(?P<no_figure>nofigureavailable)'
+                    r'|(?P<range_begin>[0-9]+)-(?P<range_end>[0-9]+)(?:-.*)?'
+                    r'|(?P<exact>[0-9]+))$')
+
 
 def generate_interval(string_interval):
     """
@@ -133,75 +219,839 @@ def generate_interval(string_interval):
     return start_interval, end_interval
 
 
-def read_files(columns):
+def generate_intervals(lobbying_costs):
+    """
+    Column-wise version of generate_interval, which transforms a complete series of lobbying costs to intervals in a
+    single pass. The same 5 string formats are supported and result in the same intervals as generate_interval.
+    Values that match none of the formats get the interval [0, 0] and are collected in a list of errors.
+    Args:
+        lobbying_costs (Series): The series with the lobbying costs from the dataframe.
+    Returns:
+        start_intervals (Series): The begin values of the intervals.
+        end_intervals (Series): The end values of the intervals.
+        errors (list[str]): The lobbying costs (without commas and whitespace) that could not be parsed.
+    """
+    # All whitespace is removed, like the non-breaking spaces that int() ignores around the numbers in generate_interval.
+    # The non-breaking space is listed separately, because \s only matches ASCII whitespace in string columns that are
+    # backed by pyarrow.
+    cleaned = lobbying_costs.str.replace(',', '', regex=False).str.replace(r'[\s\xa0]+', '', regex=True)
+    parts = cleaned.str.extract(interval_pattern)
+    values = parts.drop(columns='no_figure').apply(pd.to_numeric)
+
+    # The '>' format only sets the end of the interval, just like generate_interval does.
+    start_intervals = values['range_begin'].fillna(values['exact']).fillna(0).astype('int64')
+    end_intervals = values['below'].fillna(values['above']).fillna(values['range_end']).fillna(values['exact'])
+    end_intervals = end_intervals.fillna(0).astype('int64')
+    errors = cleaned[parts.isna().all(axis=1)].to_list()
+
+    return start_intervals, end_intervals, errors
+
+
+def all_file_path(year):
+    """
+    Method to get the path of the downloaded file with all the data of a year.
+    Args:
+        year (int): The year of the data.
+    Returns:
+        file_name (str): The path of the file.
+    """
+    year_string = str(year)
+    return './data/' + year_string + '/all/' + 'all_' + year_string + '.csv'
+
+
+def cat_file_path(year, main_cat, sub_cat):
+    """
+    Method to get the path of the downloaded file with the data of a sub category in a year.
+    Args:
+        year (int): The year of the data.
+        main_cat (int): The number of the main category.
+        sub_cat (int): The number of the sub category in the main category.
+    Returns:
+        file_name (str): The path of the file.
+    """
+    return './data/' + str(year) + '/category/' + str(main_cat) + '/' + str(sub_cat) + '.csv'
+
+
+def year_file_paths(year):
+    """
+    Method to get the paths of all the downloaded files of a year.
+    Args:
+        year (int): The year of the data.
+    Returns:
+        file_names (list[str]): The paths of the files.
+    """
+    file_names = [all_file_path(year)]
+    for j in range(1, num_categories + 1):
+        for key in sub_categories[j]:
+            file_names.append(cat_file_path(year, j, key))
+    return file_names
+
+
+def read_year(year, columns):
+    """
+    Method to read in the data of a single year which is present in the csv files in the data folder.
+    The years are independent of each other, so this method can be executed for multiple years at the same time.
+    Args:
+        year (int): The year of the data that needs to be read.
+        columns (dict): The input dictionary which contains the input types of the columns.
+    Returns:
+        dataframe (dataframe): Dataframe which contains the data of the all_ file of the year.
+        dataframes_cat (list[dataframe]): List of dataframes which contains the data of the category files of the year.
+    """
+    file_name = all_file_path(year)
+    print('Reading ALL: ', file_name)
+    dataframe = pd.read_csv(file_name, dtype=columns)
+    dataframe[year_column_name] = year
+
+    dataframes_cat = []
+    for j in range(1, num_categories + 1):
+        main_cat_str = main_categories[j]
+        sub_cat_dict = sub_categories[j]
+        for key in sub_cat_dict:
+            file_name = cat_file_path(year, j, key)
+            print('Reading CAT: ', file_name)
+            df = pd.read_csv(file_name, dtype=columns)
+            dataframes_cat.append(add_category_columns(df, year, main_cat_str, sub_cat_dict[key]))
+    return dataframe, dataframes_cat
+
+
+def add_category_columns(df, year, main_cat, sub_cat):
+    """
+    Method to add the lobbying costs interval, the year and the categories to the data of a category file.
+    Args:
+        df (dataframe): Dataframe which contains the data of a category file, or a chunk of it.
+        year (int): The year of the data.
+        main_cat (str): The name of the main category.
+        sub_cat (str): The name of the sub category.
+    Returns:
+        df (dataframe): The dataframe with the new columns.
+    """
+    begin_int, end_int, errors = generate_intervals(df[lobbying_costs_str])
+    for error in errors:
+        print('ERROR: ', error)
+    df[begin_interval_name] = begin_int
+    df[end_interval_name] = end_int
+    df[year_column_name] = year
+    df[main_cat_column_name] = main_cat
+    df[sub_cat_column_name] = sub_cat
+    return df
+
+
+def read_files(columns, workers=1):
     """
     Method to read in the data which is present in the csv files in the data folder.
     The data is loaded into pandas dataframes which is contained in a list.
+    When more than one worker is requested, the years are read in parallel by a pool of processes. The dataframes
+    are always returned in the order of the years, so the result does not depend on the amount of workers.
     Args:
         columns (dict): The input dictionary which contains the input types of the columns.
+        workers (int): The amount of processes that read the years in parallel.
     Returns:
         dataframes (list[dataframe]): List of dataframes which contains the data of the all_ files.
         dataframes_cat (list[dataframe]): List of dataframes which contains the data of the category files.
     """
+    years = range(min_year, max_year + 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(read_year, years, repeat(columns)))
+    else:
+        results = [read_year(year, columns) for year in years]
+
     dataframes = []
     dataframes_cat = []
-    for i in range(min_year, max_year + 1):
-        year_string = str(i)
-        file_name = './data/' + year_string + '/all/' + 'all_' + year_string + '.csv'
-        print('Reading ALL: ', file_name)
-        df = pd.read_csv(file_name, dtype=columns)
-        df[year_column_name] = i
-        dataframes.append(df)
+    for dataframe, year_dataframes_cat in results:
+        dataframes.append(dataframe)
+        dataframes_cat.extend(year_dataframes_cat)
+    return dataframes, dataframes_cat
 
-        for j in range(1, num_categories + 1):
-            main_cat_str = main_categories[j]
-            sub_cat_dict = sub_categories[j]
-            for key in sub_cat_dict:
-                file_name = './data/' + year_string + '/category/' + str(j) + '/' + str(key) + '.csv'
-                print('Reading CAT: ', file_name)
-                df = pd.read_csv(file_name, dtype=columns)
-                df[begin_interval_name] = 0
-                df[end_interval_name] = 0
-                for index, row in df.iterrows():
-                    lobby_cost_str = row[lobbying_costs_str]
-                    begin_int, end_int = generate_interval(lobby_cost_str)
-                    df[begin_interval_name][index] = begin_int
-                    df[end_interval_name][index] = end_int
-                df[year_column_name] = i
-                df[main_cat_column_name] = main_cat_str
-                df[sub_cat_column_name] = sub_categories[j][key]
-                dataframes_cat.append(df)
+
+def content_hash(path):
+    """
+    Method to generate the SHA-256 hash of the content of a file, or of the content of all the files in a folder.
+    Args:
+        path (str): The path of the file or folder.
+    Returns:
+        hash (str): The hexadecimal SHA-256 hash of the content.
+    """
+    if os.path.isdir(path):
+        file_names = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    else:
+        file_names = [path]
+
+    sha256 = hashlib.sha256()
+    for file_name in file_names:
+        with open(file_name, 'rb') as file:
+            sha256.update(file.read())
+    return sha256.hexdigest()
+
+
+def atomic_write(file_name, data, mode='w'):
+    """
+    Method to write a file that other processes can read at any moment. The data is written to a temporary file first,
+    which then replaces the file, so other processes never read a partially written file.
+    Args:
+        file_name (str): The path of the file.
+        data (str or bytes): The content of the file.
+        mode (str): The mode in which the file is written ('w' for text or 'wb' for bytes).
+    """
+    temporary_file = file_name + '.' + str(os.getpid())
+    with open(temporary_file, mode) as file:
+        file.write(data)
+    os.replace(temporary_file, file_name)
+
+
+def remove_outdated_files(folder, prefix, current_prefix):
+    """
+    Method to remove the files of other versions from a folder: the files of which the name starts with the prefix,
+    except the files of the current version, of which the name starts with the current prefix.
+    Args:
+        folder (str): The path of the folder.
+        prefix (str): The start of the names of the files of every version.
+        current_prefix (str): The start of the names of the files of the current version.
+    Returns:
+        removed (int): The amount of removed files.
+    """
+    removed = 0
+    for file_name in os.listdir(folder):
+        if not file_name.startswith(prefix) or file_name.startswith(current_prefix):
+            continue
+        try:
+            os.remove(os.path.join(folder, file_name))
+            removed += 1
+        except FileNotFoundError:
+            # Another process removed the file at the same time.
+            pass
+    return removed
+
+
+def file_signature(file_name, previous_signature=None):
+    """
+    Method to generate the signature of a file, which consists of its size, modification time and content hash.
+    The content of the file is only hashed again when the size or modification time differ from the previous
+    signature of the file.
+    Args:
+        file_name (str): The path of the file.
+        previous_signature (dict): The signature of the file in the manifest of the previous run, if any.
+    Returns:
+        signature (dict): The size, modification time and hash of the file.
+    """
+    stat = os.stat(file_name)
+    if previous_signature is not None and previous_signature['size'] == stat.st_size \
+            and previous_signature['mtime'] == stat.st_mtime:
+        return previous_signature
+
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'hash': content_hash(file_name)}
+
+
+def load_manifest():
+    """
+    Method to load the manifest of the previous run. The manifest is discarded when it was written for another
+    version of the cached data.
+    Returns:
+        manifest (dict): The signatures of the downloaded files of the previous run, by file name.
+    """
+    if not os.path.exists(manifest_file_name):
+        return {}
+    with open(manifest_file_name) as file:
+        manifest = json.load(file)
+    if manifest.get('version') != cache_version:
+        return {}
+    return manifest['files']
+
+
+def save_manifest(signatures):
+    """
+    Method to save the signatures of the downloaded files as the manifest for the next run.
+    Args:
+        signatures (dict): The signatures of the downloaded files, by file name.
+    """
+    with open(manifest_file_name, 'w') as file:
+        json.dump({'version': cache_version, 'files': signatures}, file, indent=2, sort_keys=True)
+
+
+def year_cache_paths(year):
+    """
+    Method to get the paths of the cached preprocessed data of a year.
+    Args:
+        year (int): The year of the data.
+    Returns:
+        all_cache_name (str): The path of the cached data of the all_ file.
+        cat_cache_name (str): The path of the cached data of the category files.
+    """
+    year_string = str(year)
+    return cache_folder + 'all_' + year_string + '.pkl', cache_folder + 'cat_' + year_string + '.pkl'
+
+
+def read_files_incremental(columns, workers=1):
+    """
+    Method to read in the data which is present in the csv files in the data folder, while only reading the years
+    of which a downloaded file changed since the previous run. The data of the other years is loaded from the cache.
+    Args:
+        columns (dict): The input dictionary which contains the input types of the columns.
+        workers (int): The amount of processes that read the changed years in parallel.
+    Returns:
+        dataframes (list[dataframe]): List of dataframes which contains the data of the all_ files.
+        dataframes_cat (list[dataframe]): List of dataframes which contains the data of the category files.
+    """
+    os.makedirs(cache_folder, exist_ok=True)
+    manifest = load_manifest()
+    signatures = {}
+    changed_years = []
+    for year in range(min_year, max_year + 1):
+        changed = not all(os.path.exists(path) for path in year_cache_paths(year))
+        for file_name in year_file_paths(year):
+            previous_signature = manifest.get(file_name)
+            signatures[file_name] = file_signature(file_name, previous_signature)
+            if previous_signature is None or previous_signature['hash'] != signatures[file_name]['hash']:
+                changed = True
+        if changed:
+            changed_years.append(year)
+
+    print('Changed years: ', changed_years)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(read_year, changed_years, repeat(columns))
+            changed_results = dict(zip(changed_years, results))
+    else:
+        changed_results = {year: read_year(year, columns) for year in changed_years}
+
+    dataframes = []
+    dataframes_cat = []
+    for year in range(min_year, max_year + 1):
+        all_cache_name, cat_cache_name = year_cache_paths(year)
+        if year in changed_results:
+            dataframe, year_dataframes_cat = changed_results[year]
+            dataframe_cat = pd.concat(year_dataframes_cat)
+            dataframe.to_pickle(all_cache_name)
+            dataframe_cat.to_pickle(cat_cache_name)
+        else:
+            print('Reading CACHE: ', all_cache_name, cat_cache_name)
+            dataframe = pd.read_pickle(all_cache_name)
+            dataframe_cat = pd.read_pickle(cat_cache_name)
+        dataframes.append(dataframe)
+        dataframes_cat.append(dataframe_cat)
+
+    save_manifest(signatures)
     return dataframes, dataframes_cat
 
 
-def generate_data():
+def list_countries(countries):
+    """
+    Method to generate the sorted list of distinct countries in a column of countries, with the wrongly written
+    countries renamed and the excluded countries left out.
+    Args:
+        countries (Series): The column with the country of every row.
+    Returns:
+        countries (list[str]): The sorted list of distinct countries.
+    """
+    countries = countries.dropna().drop_duplicates().to_list()
+    countries = [country_name_corrections.get(country, country) for country in countries
+                 if country not in excluded_countries]
+    countries.sort()
+    return countries
+
+
+def generate_countries(dataframe):
+    """
+    Method to resolve the ISO 3 code of every country in the data once, so the application does not need to convert
+    the country names when it starts.
+    Args:
+        dataframe (dataframe): Dataframe which contains the data of the category files.
+    Returns:
+        countries (dataframe): Dataframe with the name and the ISO 3 code of every country.
+    """
+    # Only imported here, because the rest of this module is also imported by the application.
+    import country_converter as coco
+
+    countries = list_countries(dataframe[country_head_office_str])
+    iso3_codes = coco.convert(names=countries, to='ISO3')
+    return pd.DataFrame({country_column_name: countries, iso3_column_name: iso3_codes})
+
+
+def suggest_projection_scale(bounding_box):
+    """
+    Method to suggest the projection scale (zoom level) of the world map for a country, so that the whole country
+    and some of its surroundings are visible.
+    Args:
+        bounding_box (list[str]): The south, north, west and east border of the country in degrees.
+    Returns:
+        projection_scale (float): The suggested projection scale, between 1 and 8.
+    """
+    south, north, west, east = [float(border) for border in bounding_box]
+    span = max(north - south, (east - west) / 2, 1)
+    return round(min(max(60 / span, 1), 8), 1)
+
+
+def generate_centroids(countries):
+    """
+    Method to add the centroids of the countries that are missing in the bundled file with centroids. The missing
+    countries are geocoded with Nominatim, which requires geopy and an internet connection. When geopy is not
+    installed, the missing countries are only reported.
+    Args:
+        countries (list[str]): The countries that need a centroid.
+    Returns:
+        centroids (dataframe): Dataframe with the centroid and suggested projection scale of every country.
+    """
+    centroids = pd.read_csv(centroids_file_name, keep_default_na=False)
+    missing_countries = [country for country in countries if country not in set(centroids[country_column_name])]
+    if not missing_countries:
+        return centroids
+
+    # Only imported here, because geocoding is only needed when a new country appears in the data.
+    try:
+        from geopy.exc import GeopyError
+        from geopy.extra.rate_limiter import RateLimiter
+        from geopy.geocoders import Nominatim
+    except ImportError:
+        print('ERROR: geopy is not installed, no centroids for: ', missing_countries)
+        return centroids
+
+    geocode = RateLimiter(Nominatim(user_agent="Imperium").geocode, min_delay_seconds=1)
+    rows = []
+    for index, country in enumerate(missing_countries):
+        print('Geocoding: ', country)
+        try:
+            location = geocode(country)
+        except GeopyError as error:
+            print('ERROR: geocoding failed (', error, '), no centroids for: ', missing_countries[index:])
+            break
+        if location is None:
+            print('ERROR: no centroid for: ', country)
+            continue
+        rows.append({country_column_name: country,
+                     latitude_column_name: location.latitude,
+                     longitude_column_name: location.longitude,
+                     projection_scale_column_name: suggest_projection_scale(location.raw['boundingbox'])})
+
+    centroids = pd.concat([centroids, pd.DataFrame(rows)], ignore_index=True)
+    return centroids.sort_values(by=country_column_name)
+
+
+def generate_totals(dataframe, dimensions=totals_dimensions):
+    """
+    Method to compute the totals per year of every country, sub category and organisation, so the explore plots do
+    not need to sum the rows of the data. For every value the begin, middle and end of the lobbying costs intervals,
+    the EP passes, the lobbyists and the meetings are summed.
+    Args:
+        dataframe (dataframe): Dataframe which contains the data of the category files.
+        dimensions (list[str]): The columns by which the totals are computed.
+    Returns:
+        totals (dataframe): Dataframe with the totals per dimension, value and year.
+    """
+    summed_columns = [begin_interval_name, end_interval_name, ep_passes_str, lobbyists_fte_str, num_meetings_str]
+    summed_types = {begin_interval_name: 'int64', end_interval_name: 'int64', ep_passes_str: 'int64',
+                    lobbyists_fte_str: 'float64', num_meetings_str: 'int64'}
+    totals = []
+    for dimension in dimensions:
+        dimension_totals = dataframe.groupby([dimension, year_column_name], observed=True)[summed_columns]
+        dimension_totals = dimension_totals.sum().astype(summed_types).reset_index()
+        dimension_totals = dimension_totals.rename(columns={dimension: value_column_name})
+        dimension_totals[value_column_name] = dimension_totals[value_column_name].astype(str)
+        dimension_totals.insert(0, dimension_column_name, dimension)
+        totals.append(dimension_totals)
+
+    totals = pd.concat(totals, ignore_index=True)
+    totals[year_column_name] = totals[year_column_name].astype('int64')
+    totals.insert(totals.columns.get_loc(end_interval_name), middle_interval_name,
+                  (totals[begin_interval_name] + totals[end_interval_name]) / 2)
+    return totals
+
+
+def save_parquet(dataframe, file_name):
+    """
+    Method to save a dataframe as a Parquet file, where the columns with few distinct values are stored as categoricals.
+    Args:
+        dataframe (dataframe): The dataframe that needs to be saved.
+        file_name (str): The path of the Parquet file.
+    """
+    categorical_types = {column: 'category' for column in categorical_columns if column in dataframe.columns}
+    dataframe.astype(categorical_types).to_parquet(file_name, index=False)
+
+
+def save_mmap(dataframe, folder_name):
+    """
+    Method to save a dataframe as a folder with NumPy files, which can be memory-mapped read-only by multiple processes
+    at the same time. The numeric columns of the same type are stored together in one NumPy file with a row per column,
+    so they form a single block of the loaded dataframe, which pandas does not need to copy to combine them. The string
+    columns are dictionary encoded: their NumPy file contains the categorical codes and the categories themselves are
+    stored in the columns file. An existing folder is replaced.
+    Args:
+        dataframe (dataframe): The dataframe that needs to be saved.
+        folder_name (str): The path of the folder.
+    """
+    if os.path.isdir(folder_name):
+        shutil.rmtree(folder_name)
+    os.makedirs(folder_name)
+    columns_description = []
+    numeric_columns = {}
+    for index, column in enumerate(dataframe.columns):
+        values = dataframe[column]
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            type_columns = numeric_columns.setdefault(values.dtype.name, [])
+            columns_description.append({'name': column, 'file': values.dtype.name + '.npy', 'row': len(type_columns)})
+            type_columns.append(values.to_numpy())
+        else:
+            column_file_name = str(index) + '.npy'
+            categorical = pd.Categorical(values)
+            columns_description.append({'name': column, 'file': column_file_name,
+                                        'categories': categorical.categories.to_list()})
+            np.save(folder_name + column_file_name, categorical.codes)
+
+    for type_name, type_columns in numeric_columns.items():
+        np.save(folder_name + type_name + '.npy', np.stack(type_columns))
+
+    with open(folder_name + mmap_columns_file_name, 'w') as file:
+        json.dump(columns_description, file)
+
+
+def load_organisation_ids():
+    """
+    Method to load the IDs of the organisations that were assigned in the previous runs.
+    Returns:
+        organisation_ids (dict): The IDs of the organisations, by organisation name.
+    """
+    if not os.path.exists(organisations_file_name):
+        return {}
+    organisations = pd.read_csv(organisations_file_name, dtype={organisation_name_str: str}, keep_default_na=False)
+    return dict(zip(organisations[organisation_name_str], organisations[organisation_id_column_name]))
+
+
+def assign_organisation_id(organisation_ids, organisation):
+    """
+    Method to get the ID of an organisation, where a new organisation gets the next ID. The IDs start at 1, so they
+    are never mistaken for an empty dropdown in the browser, and are never removed, so the next ID follows from the
+    amount of organisations.
+    Args:
+        organisation_ids (dict): The IDs of the organisations, by organisation name, to which new IDs are added.
+        organisation (str): The name of the organisation.
+    Returns:
+        organisation_id (int): The ID of the organisation.
+    """
+    if organisation not in organisation_ids:
+        organisation_ids[organisation] = len(organisation_ids) + 1
+    return organisation_ids[organisation]
+
+
+def add_organisation_ids(dataframe, organisation_ids):
+    """
+    Method to add the ID of the organisation to the data, where the new organisations get the next IDs in the
+    order of their names. The rows without organisation name get the ID of the empty name after all other names,
+    like in merge_runs, which reads the missing names as empty text.
+    Args:
+        dataframe (dataframe): The dataframe with the organisation names.
+        organisation_ids (dict): The IDs of the organisations, by organisation name, to which new IDs are added.
+    """
+    organisations = dataframe[organisation_name_str].fillna('')
+    for organisation in sorted(organisations.drop_duplicates(), key=lambda name: (name == '', name)):
+        assign_organisation_id(organisation_ids, organisation)
+    dataframe[organisation_id_column_name] = organisations.map(organisation_ids).astype('int64')
+
+
+def save_organisation_ids(organisation_ids):
+    """
+    Method to save the IDs of the organisations for the next runs.
+    Args:
+        organisation_ids (dict): The IDs of the organisations, by organisation name.
+    """
+    organisations = pd.DataFrame({organisation_id_column_name: list(organisation_ids.values()),
+                                  organisation_name_str: list(organisation_ids.keys())})
+    organisations.sort_values(by=organisation_id_column_name).to_csv(organisations_file_name, index=False)
+
+
+def generate_data(workers=1, incremental=False):
     """
     Method to start reading the files, concat the resulting dataframes and sort the dataframe data based on
-    the organisation name and the year of the published data.
+    the organisation name and the year of the published data. The ID of the organisation is added to the data.
     Args:
-        ()
+        workers (int): The amount of processes that read the years in parallel.
+        incremental (bool): Only read the years of which the downloaded files changed since the previous run.
     Returns:
         dataframe_all (dataframe): Dataframe which contains the data of the all_ files.
         dataframe_cat (dataframe): Dataframe which contains the data of the category files.
     """
-    dataframes_all, dataframes_cat = read_files(columns)
+    if incremental:
+        dataframes_all, dataframes_cat = read_files_incremental(columns, workers)
+    else:
+        dataframes_all, dataframes_cat = read_files(columns, workers)
     dataframe_all = pd.concat(dataframes_all)
     dataframe_cat = pd.concat(dataframes_cat)
     dataframe_all = dataframe_all.sort_values(by=[organisation_name_str, year_column_name])
     dataframe_cat = dataframe_cat.sort_values(by=[organisation_name_str, year_column_name])
     dataframe_all['lobbyists (FTE)'] = dataframe_all['lobbyists (FTE)'].fillna(0)
     dataframe_cat['lobbyists (FTE)'] = dataframe_cat['lobbyists (FTE)'].fillna(0)
+
+    # The new organisations of the all_ files get their IDs first, just like in the streaming mode.
+    organisation_ids = load_organisation_ids()
+    add_organisation_ids(dataframe_all, organisation_ids)
+    add_organisation_ids(dataframe_cat, organisation_ids)
+    save_organisation_ids(organisation_ids)
     return dataframe_all, dataframe_cat
 
 
+def read_all_chunks(columns, chunk_rows):
+    """
+    Method to read the all_ files of every year in chunks, in the same order as read_files.
+    Args:
+        columns (dict): The input dictionary which contains the input types of the columns.
+        chunk_rows (int): The amount of rows in a chunk.
+    Returns:
+        chunks (iterator[dataframe]): The chunks of the data of the all_ files.
+    """
+    for year in range(min_year, max_year + 1):
+        file_name = all_file_path(year)
+        print('Reading ALL: ', file_name)
+        for df in pd.read_csv(file_name, dtype=columns, chunksize=chunk_rows):
+            df[year_column_name] = year
+            yield df
+
+
+def read_cat_chunks(columns, chunk_rows):
+    """
+    Method to read the category files of every year in chunks, in the same order as read_files.
+    Args:
+        columns (dict): The input dictionary which contains the input types of the columns.
+        chunk_rows (int): The amount of rows in a chunk.
+    Returns:
+        chunks (iterator[dataframe]): The chunks of the data of the category files, with the new columns.
+    """
+    for year in range(min_year, max_year + 1):
+        for j in range(1, num_categories + 1):
+            for key in sub_categories[j]:
+                file_name = cat_file_path(year, j, key)
+                print('Reading CAT: ', file_name)
+                for df in pd.read_csv(file_name, dtype=columns, chunksize=chunk_rows):
+                    yield add_category_columns(df, year, main_categories[j], sub_categories[j][key])
+
+
+def spill_run(dataframes, run_file_name):
+    """
+    Method to sort the buffered chunks the way generate_data sorts the data and to write them to disk as a run.
+    Args:
+        dataframes (list[dataframe]): The buffered chunks, in the order in which they were read.
+        run_file_name (str): The path of the run.
+    """
+    run = pd.concat(dataframes)
+    run = run.sort_values(by=[organisation_name_str, year_column_name])
+    run[lobbyists_fte_str] = run[lobbyists_fte_str].fillna(0)
+    run.to_csv(run_file_name, index=False)
+
+
+def merge_runs(run_file_names, file_name, organisation_ids):
+    """
+    Method to merge the sorted runs into a single sorted CSV file, while only keeping a row of every run in memory.
+    Rows that are equal in organisation name and year keep the order of the runs, so the result is the same as a
+    stable sort of all the data. Like in pandas, the rows without organisation name come last. The ID of the
+    organisation is added to every row, the rows are merged in the order of the names, so the new organisations
+    get the next IDs in the order of their names.
+    Args:
+        run_file_names (list[str]): The paths of the runs, in the order in which they were written.
+        file_name (str): The path of the merged CSV file.
+        organisation_ids (dict): The IDs of the organisations, by organisation name, to which new IDs are added.
+    """
+    run_files = [open(run_file_name, newline='') for run_file_name in run_file_names]
+    try:
+        readers = [csv.reader(run_file) for run_file in run_files]
+        header = [next(reader) for reader in readers][0]
+        organisation_index = header.index(organisation_name_str)
+        year_index = header.index(year_column_name)
+
+        def sort_key(row):
+            return row[organisation_index] == '', row[organisation_index], int(row[year_index])
+
+        with open(file_name, 'w', newline='') as file:
+            writer = csv.writer(file, lineterminator=os.linesep)
+            writer.writerow(header + [organisation_id_column_name])
+            for row in heapq.merge(*readers, key=sort_key):
+                writer.writerow(row + [assign_organisation_id(organisation_ids, row[organisation_index])])
+    finally:
+        for run_file in run_files:
+            run_file.close()
+
+
+def external_sort(chunks, file_name, memory_budget, organisation_ids):
+    """
+    Method to sort the chunks by organisation name and year into a CSV file without keeping all the data in memory.
+    The chunks are buffered until they take half of the memory budget, because sorting copies them, after which the
+    buffer is sorted and spilled to disk as a run. Finally the runs are merged. All chunks get the columns of the
+    first chunk.
+    Args:
+        chunks (iterator[dataframe]): The chunks of the data.
+        file_name (str): The path of the sorted CSV file.
+        memory_budget (int): The memory budget in bytes.
+        organisation_ids (dict): The IDs of the organisations, by organisation name, to which new IDs are added.
+    """
+    os.makedirs(runs_folder, exist_ok=True)
+    run_name = os.path.splitext(os.path.basename(file_name))[0]
+    run_file_names = []
+    buffer = []
+    buffer_size = 0
+    header = None
+
+    def spill():
+        run_file_name = runs_folder + run_name + '_' + str(len(run_file_names)) + '.csv'
+        print('Writing RUN: ', run_file_name)
+        spill_run(buffer, run_file_name)
+        run_file_names.append(run_file_name)
+
+    for chunk in chunks:
+        if header is None:
+            header = chunk.columns
+        buffer.append(chunk.reindex(columns=header))
+        buffer_size += chunk.memory_usage(deep=True).sum()
+        if buffer_size >= memory_budget // 2:
+            spill()
+            buffer = []
+            buffer_size = 0
+    if buffer:
+        spill()
+
+    print('Merging RUNS: ', file_name)
+    merge_runs(run_file_names, file_name, organisation_ids)
+    for run_file_name in run_file_names:
+        os.remove(run_file_name)
+
+
+def combine_totals(totals):
+    """
+    Method to combine totals that were computed by generate_totals over parts of the data into the totals of all
+    the data, in the same order as generate_totals.
+    Args:
+        totals (list[dataframe]): The totals of the parts of the data.
+    Returns:
+        totals (dataframe): Dataframe with the totals per dimension, value and year.
+    """
+    keys = [dimension_column_name, value_column_name, year_column_name]
+    totals = pd.concat(totals, ignore_index=True).drop(columns=middle_interval_name)
+    totals = totals.groupby(keys, sort=False).sum().reset_index()
+    dimension_order = totals[dimension_column_name].map(totals_dimensions.index)
+    totals = totals.assign(order=dimension_order).sort_values(by=['order', value_column_name, year_column_name])
+    totals = totals.drop(columns='order').reset_index(drop=True)
+    totals.insert(totals.columns.get_loc(end_interval_name), middle_interval_name,
+                  (totals[begin_interval_name] + totals[end_interval_name]) / 2)
+    return totals
+
+
+def generate_totals_streaming(file_name, totals_file_name, chunk_rows):
+    """
+    Method to compute the totals like generate_totals from the sorted CSV file with the data of the category files,
+    which is read in chunks. The totals of the countries and sub categories are small and are combined in memory.
+    The data is sorted by organisation, so the totals of an organisation are complete once the chunk with its last
+    row is read: only the rows of the last organisation of a chunk are kept for the next chunk and the totals of the
+    other organisations are written directly after the totals of the countries and sub categories.
+    Args:
+        file_name (str): The path of the sorted CSV file with the data of the category files.
+        totals_file_name (str): The path of the CSV file with the totals.
+        chunk_rows (int): The amount of rows that is read at once.
+    Returns:
+        countries (dataframe): Dataframe with the distinct countries in the column of the country of the head office.
+    """
+    dimensions = [country_head_office_str, sub_cat_column_name]
+    organisation_totals_file_name = runs_folder + 'organisation_totals.csv'
+    totals = []
+    remainder = None
+    with open(organisation_totals_file_name, 'w', newline='') as file:
+        for df in pd.read_csv(file_name, dtype=columns, chunksize=chunk_rows):
+            totals = [combine_totals(totals + [generate_totals(df, dimensions)])]
+
+            df = df[df[organisation_name_str].notna()]
+            if remainder is not None:
+                df = pd.concat([remainder, df])
+            last_organisation = df[organisation_name_str] == df[organisation_name_str].iloc[-1]
+            remainder = df[last_organisation]
+            organisation_totals = generate_totals(df[~last_organisation], [organisation_name_str])
+            organisation_totals.to_csv(file, index=False, header=False)
+        if remainder is not None:
+            organisation_totals = generate_totals(remainder, [organisation_name_str])
+            organisation_totals.to_csv(file, index=False, header=False)
+
+    print('Writing TOTALS: ', totals_file_name)
+    totals = totals[0]
+    with open(totals_file_name, 'w', newline='') as file:
+        totals.to_csv(file, index=False)
+        with open(organisation_totals_file_name, newline='') as organisation_totals_file:
+            shutil.copyfileobj(organisation_totals_file, file)
+    os.remove(organisation_totals_file_name)
+
+    countries = totals.loc[totals[dimension_column_name] == country_head_office_str, value_column_name]
+    return pd.DataFrame({country_head_office_str: countries.drop_duplicates()})
+
+
+def generate_data_streaming(memory_budget=default_memory_budget, chunk_rows=stream_chunk_rows):
+    """
+    Method to preprocess the downloaded files in chunks and to write the data and the totals directly to the CSV
+    files, so the memory that is needed does not grow with the size of the downloaded data. The Parquet and
+    memory-mapped versions of the data are not written, because they need all the data at once, so the outdated
+    versions are removed and the application loads the CSV files.
+    Args:
+        memory_budget (int): The memory budget of the sorting in megabytes.
+        chunk_rows (int): The amount of rows that is read from a downloaded file at once.
+    Returns:
+        countries (dataframe): Dataframe with the distinct countries in the column of the country of the head office.
+    """
+    memory_budget = memory_budget * 1024 * 1024
+    organisation_ids = load_organisation_ids()
+    external_sort(read_all_chunks(columns, chunk_rows), all_file_name, memory_budget, organisation_ids)
+    external_sort(read_cat_chunks(columns, chunk_rows), cat_file_name, memory_budget, organisation_ids)
+    save_organisation_ids(organisation_ids)
+    countries = generate_totals_streaming(cat_file_name, totals_file_name, chunk_rows)
+
+    for outdated in [all_parquet_file_name, cat_parquet_file_name, totals_parquet_file_name]:
+        if os.path.exists(outdated):
+            print('Removing: ', outdated)
+            os.remove(outdated)
+    if os.path.isdir(cat_mmap_folder_name):
+        print('Removing: ', cat_mmap_folder_name)
+        shutil.rmtree(cat_mmap_folder_name)
+
+    return countries
+
+
 if __name__ == "__main__":
-    print('Starting Preprocessing...')
-    df_all, df_cat = generate_data()
-    print('Finished Preprocessing...')
-    
-    # Save dataframes as CSV files
-    print('Starting File Saving...')
-    df_all.to_csv(all_file_name, index=False)
-    df_cat.to_csv(cat_file_name, index=False)
+    parser = argparse.ArgumentParser(description='Preprocess the downloaded LobbyFacts CSV files.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='The amount of processes that read the years in parallel (default: 1).')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only read the years of which the downloaded files changed since the previous run.')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Read the downloaded files in chunks and sort the data on disk, which only writes the '
+                             'CSV files of the data.')
+    parser.add_argument('--memory-budget', type=int, default=default_memory_budget,
+                        help='The memory budget of the streaming mode in megabytes (default: ' +
+                             str(default_memory_budget) + ').')
+    args = parser.parse_args()
+
+    if args.streaming:
+        print('Starting Streaming Preprocessing...')
+        df_countries = generate_data_streaming(args.memory_budget)
+        print('Finished Streaming Preprocessing...')
+    else:
+        print('Starting Preprocessing...')
+        df_all, df_cat = generate_data(args.workers, args.incremental)
+        print('Finished Preprocessing...')
+
+        # Save dataframes as CSV files
+        print('Starting File Saving...')
+        df_all.to_csv(all_file_name, index=False)
+        df_cat.to_csv(cat_file_name, index=False)
+
+        # Save dataframes as Parquet files
+        save_parquet(df_all, all_parquet_file_name)
+        save_parquet(df_cat, cat_parquet_file_name)
+
+        # Save the dataframe with categories as memory-mappable NumPy files
+        save_mmap(df_cat, cat_mmap_folder_name)
+
+        # Save the totals per year of every country, sub category and organisation
+        df_totals = generate_totals(df_cat)
+        df_totals.to_csv(totals_file_name, index=False)
+        df_totals.to_parquet(totals_parquet_file_name, index=False)
+        df_countries = df_cat
+
+    # Save the ISO 3 codes of the countries
+    df_countries = generate_countries(df_countries)
+    df_countries.to_csv(countries_file_name, index=False)
+
+    # Add the centroids of new countries to the bundled file with centroids
+    generate_centroids(df_countries[country_column_name].to_list()).to_csv(centroids_file_name, index=False)
 
     print('Finished')
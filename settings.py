@@ -0,0 +1,45 @@
+import os
+
+# Load the preprocessed data from memory-mapped NumPy files instead of the CSV or Parquet file, so all the workers
+# of the web server share the same physical memory. Enabled by setting the environment variable IMPERIUM_MMAP to 1.
+use_mmap = os.environ.get('IMPERIUM_MMAP', '0') == '1'
+
+# The maximum amount of explore and compare figures that every worker keeps in its cache. Set the environment variable
+# IMPERIUM_FIGURE_CACHE_SIZE to 0 to disable the cache.
+figure_cache_size = int(os.environ.get('IMPERIUM_FIGURE_CACHE_SIZE', '256'))
+
+# Folder in which the workers share their cached figures. When the environment variable IMPERIUM_FIGURE_CACHE_FOLDER
+# is not set, every worker only uses its own cache.
+figure_cache_folder = os.environ.get('IMPERIUM_FIGURE_CACHE_FOLDER')
+
+# The maximum amount of figures in the folder in which the workers share their cached figures.
+figure_cache_shared_size = int(os.environ.get('IMPERIUM_FIGURE_CACHE_SHARED_SIZE', '4096'))
+
+# Only send the organisations that match the text typed in the organisation dropdowns to the browser, instead of all
+# organisations. Enabled by setting the environment variable IMPERIUM_DYNAMIC_OPTIONS to 1.
+dynamic_organisation_options = os.environ.get('IMPERIUM_DYNAMIC_OPTIONS', '0') == '1'
+
+# The maximum amount of organisations that is sent to the browser for the text typed in an organisation dropdown.
+organisation_search_limit = int(os.environ.get('IMPERIUM_ORGANISATION_SEARCH_LIMIT', '50'))
+
+# Record the time spent in the phases of every callback, the size of its response and the hits of the figure cache,
+# which are served in the Prometheus text format at /metrics. Enabled by setting the environment variable
+# IMPERIUM_METRICS to 1.
+callback_metrics = os.environ.get('IMPERIUM_METRICS', '0') == '1'
+
+# The amount of seconds between the summaries of the callback metrics in the log.
+metrics_log_interval = int(os.environ.get('IMPERIUM_METRICS_LOG_INTERVAL', '60'))
+
+# Defer loading the data, building the world map and creating the layout until the layout is first requested, so
+# the server starts faster. Enabled by setting the environment variable IMPERIUM_LAZY_STARTUP to 1.
+lazy_startup = os.environ.get('IMPERIUM_LAZY_STARTUP', '0') == '1'
+
+# Send the totals of every country, sub category and organisation to the browser once and create the explore plot and
+# the information cards in the browser, instead of requesting them from the server for every selection. Enabled by
+# setting the environment variable IMPERIUM_CLIENTSIDE_EXPLORE to 1.
+clientside_explore = os.environ.get('IMPERIUM_CLIENTSIDE_EXPLORE', '0') == '1'
+
+# Keep the data in a compact representation in memory: the string columns as categoricals, the registered date as a
+# date and the integer columns in the narrowest type that can hold them. Enabled by setting the environment variable
+# IMPERIUM_COMPACT_DATA to 1.
+compact_data = os.environ.get('IMPERIUM_COMPACT_DATA', '0') == '1'
@@ -1,11 +1,30 @@
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from geopy.geocoders import Nominatim
 
-# Initialising the GeoPy geolocator to receive geocodes from a country by name
-# Which will be used for zooming to a specific country
-geolocator = Nominatim(user_agent="Imperium")
+from preprocessing import centroids_file_name
+
+
+def load_centroids():
+    """
+    This function will load the bundled centroids and suggested projection scales of the countries.
+    :return: A dictionary with the countries as keys and (latitude, longitude, projection scale) tuples as values.
+    """
+    centroids = pd.read_csv(centroids_file_name, keep_default_na=False)
+    return {row.country: (row.latitude, row.longitude, row.projection_scale) for row in centroids.itertuples()}
+
+
+# The centroids which will be used for zooming to a specific country
+centroids = load_centroids()
+
+
+def locate_country(country_name):
+    """
+    This function will look up the centroid and the suggested projection scale of a country in the bundled file with
+    centroids. The preprocessing adds every country in the data to that file, so countries are never geocoded while a
+    request is handled.
+    :param country_name: The name of the country.
+    :return: A (latitude, longitude, projection scale) tuple, or None when the country is not in the file.
+    """
+    return centroids.get(country_name)
 
 
 def map_plot(iso3_codes, countries_organisations_amount,countries_list):
@@ -17,6 +36,9 @@ def map_plot(iso3_codes, countries_organisations_amount,countries_list):
     :param country_name: A list that contains all the countries.
     :return: An new world map.
     """
+    # Only imported here, because importing Plotly Express takes long and the world map can be built on first use.
+    import plotly.express as px
+
     d = {'ISO-3': iso3_codes, 'spending': countries_organisations_amount, 'countries': countries_list}
     df = pd.DataFrame(data=d)
     fig = px.choropleth(df,
@@ -42,17 +64,20 @@ def map_plot(iso3_codes, countries_organisations_amount,countries_list):
 
 def zoom_world_map(world_map, country_name):
     """
-    This function will zoom on the world map where the user has clicked.
-    :param world_map: The current world map.
+    This function will zoom on the world map where the user has clicked. The given world map is not changed, only the
+    layout of the returned copy is patched, so the same world map can be reused for every zoom.
+    :param world_map: The current world map as a dictionary.
     :param country_name: The country where the user has clicked.
-    :return: An updated world map.
+    :return: An updated world map as a dictionary.
     """
-    location = geolocator.geocode(country_name)
-    latitude, longitude = location.latitude, location.longitude
+    location = locate_country(country_name)
+    if location is None:
+        return world_map
+    latitude, longitude, projection_scale = location
+    geo = world_map['layout']['geo']
     geo = dict(
-        projection_scale=2,  # this is kind of like zoom
+        geo,
+        projection=dict(geo.get('projection', {}), scale=projection_scale),  # this is kind of like zoom
         center=dict(lat=latitude, lon=longitude),  # this will center on the point
     )
-    world_map.update_layout(geo=geo)
-    return world_map
-    
\ No newline at end of file
+    return dict(world_map, layout=dict(world_map['layout'], geo=geo))